@@ -2,9 +2,43 @@
 
 import os
 import sys
-import PyPDF2
 import pytesseract
 from pdf2image import convert_from_path
+try:
+    # Optional: keeps the Tesseract engine loaded in-process between pages
+    from tesserocr import PyTessBaseAPI, OEM, PSM
+except ImportError:
+    PyTessBaseAPI = None
+try:
+    # Optional: vectorized word grouping (and required by cv2)
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    # Optional: faster OCR preprocessing (CLAHE + sharpen) than PIL's ImageEnhance
+    import cv2
+except ImportError:
+    cv2 = None
+try:
+    # Optional: scores every language indicator in a single pass over the text
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+try:
+    # Optional: much faster non-cryptographic hashing for translation cache keys
+    import xxhash
+except ImportError:
+    xxhash = None
+try:
+    # Optional: one keep-alive HTTP session for many concurrent Google requests
+    import aiohttp
+except ImportError:
+    aiohttp = None
+try:
+    # Optional: faster JSON for cached PDF results and translation responses
+    import orjson
+except ImportError:
+    orjson = None
 import langdetect
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
@@ -15,17 +49,26 @@ from reportlab.lib.enums import TA_JUSTIFY
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from deep_translator import GoogleTranslator, MyMemoryTranslator, LingueeTranslator, DeeplTranslator
+from deep_translator.exceptions import TooManyRequests, ServerException, RequestError, NotValidLength, NotValidPayload
 import io
 import re
 import argparse
 import tempfile
-import uuid
 import fitz  # PyMuPDF - for preserving images in PDFs
 import concurrent.futures
+import multiprocessing
+import asyncio
+import queue
+import threading
 import time
+import random
+import math
 import json
 import hashlib
-from functools import lru_cache
+import sqlite3
+import atexit
+from functools import lru_cache, partial, wraps
+from collections import OrderedDict, deque
 
 # Configure pytesseract path (adjust if needed)
 # pytesseract.pytesseract.tesseract_cmd = '/usr/bin/tesseract'
@@ -61,6 +104,7 @@ def setup_args():
     translate_parser.add_argument('output_path', help='Path to output text file')
     translate_parser.add_argument('source_lang', help='Source language code')
     translate_parser.add_argument('target_lang', help='Target language code')
+    translate_parser.add_argument('--refresh-cache', '--force-refresh', dest='refresh_cache', action='store_true', help='Discard cached translations for this language pair')
     
     # Create PDF command
     create_pdf_parser = subparsers.add_parser('create_pdf', help='Create PDF from text')
@@ -82,20 +126,94 @@ def setup_args():
     translate_pdf_parser.add_argument('output_path', help='Path to output PDF file')
     translate_pdf_parser.add_argument('source_lang', help='Source language code')
     translate_pdf_parser.add_argument('target_lang', help='Target language code')
+    translate_pdf_parser.add_argument('--refresh-cache', '--force-refresh', dest='refresh_cache', action='store_true', help='Discard cached translations for this language pair')
     
     return parser.parse_args()
 
+# Fingerprints keyed by (pdf_path, mtime, size) so each file is read at most once per process
+_pdf_fingerprints = {}
+
+def pdf_fingerprint(pdf_path):
+    """Content fingerprint of a PDF: xxh3-128 (or BLAKE2b) of the first 1 MiB salted with the file size"""
+    stat = os.stat(pdf_path)
+    key = (os.path.abspath(pdf_path), stat.st_mtime, stat.st_size)
+    if key not in _pdf_fingerprints:
+        with open(pdf_path, 'rb') as f:
+            head = f.read(1 << 20)
+        digest = xxhash.xxh3_128(head) if xxhash is not None else hashlib.blake2b(head, digest_size=16)
+        digest.update(str(stat.st_size).encode('ascii'))
+        _pdf_fingerprints[key] = digest.hexdigest()
+    return _pdf_fingerprints[key]
+
+def json_loads(data):
+    """Parse JSON text, using orjson when available"""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+def json_dumps(value):
+    """Serialize a value to JSON text, using orjson when available"""
+    return orjson.dumps(value).decode() if orjson is not None else json.dumps(value)
+
+def get_pdf_result(pdf_path, name):
+    """Look up a stored result of `name` for a PDF with the same content, returning None on a miss"""
+    try:
+        fingerprint = pdf_fingerprint(pdf_path)
+        with _CACHE_LOCK:
+            row = _CACHE_DB.execute(
+                "SELECT val FROM pdf_results WHERE fp=? AND name=? AND ts>?",
+                (fingerprint, name, int(time.time()) - PDF_RESULT_TTL)
+            ).fetchone()
+        return json_loads(row[0]) if row else None
+    except (OSError, sqlite3.Error, ValueError) as e:
+        print(f"Error reading PDF result cache: {e}")
+        return None
+
+def save_pdf_result(pdf_path, name, value):
+    """Store the result of `name` for a PDF, keyed by its content fingerprint, dropping expired results"""
+    try:
+        fingerprint = pdf_fingerprint(pdf_path)
+        now = int(time.time())
+        with _CACHE_LOCK:
+            _CACHE_DB.execute("DELETE FROM pdf_results WHERE ts<=?", (now - PDF_RESULT_TTL,))
+            _CACHE_DB.execute(
+                "INSERT OR REPLACE INTO pdf_results(fp, name, val, ts) VALUES (?, ?, ?, ?)",
+                (fingerprint, name, json_dumps(value), now)
+            )
+            _CACHE_DB.commit()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error saving PDF result cache: {e}")
+
+def memoize_pdf_result(fn):
+    """Reuse fn(pdf_path)'s result across runs for PDFs with the same content; fn returns None
+    when it could not decide (errors, no usable text), and that is never stored"""
+    @wraps(fn)
+    def wrapper(pdf_path):
+        cached = get_pdf_result(pdf_path, fn.__name__)
+        if cached is not None:
+            print(f"Using cached {fn.__name__} result for {pdf_path}")
+            return cached
+        result = fn(pdf_path)
+        if result is not None:
+            save_pdf_result(pdf_path, fn.__name__, result)
+        return result
+    return wrapper
+
 def extract_text(pdf_path, output_path):
     """Extract text from a PDF file with optimizations for speed"""
-    text = ""
+    parts = []
     
     try:
+        # Reuse text extracted earlier from a PDF with the same content
+        cached_text = get_pdf_result(pdf_path, 'extract_text')
+        if cached_text is not None:
+            print(f"Using cached text extraction for {pdf_path}")
+            with open(output_path, 'w', encoding='utf-8') as output_file:
+                output_file.write(cached_text)
+            return True
+        
         print(f"Fast text extraction from {pdf_path}")
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            
+        with fitz.open(pdf_path) as pdf_document, open(output_path, 'w', encoding='utf-8') as output_file:
             # Get number of pages
-            num_pages = len(reader.pages)
+            num_pages = pdf_document.page_count
             print(f"PDF has {num_pages} pages")
             
             # FAST MODE: Only process a subset of pages for instant results
@@ -122,21 +240,24 @@ def extract_text(pdf_path, output_path):
                     
                 print(f"Processing sample of {len(pages_to_extract)} pages from {num_pages} total pages")
             
-            # Extract text from selected pages
+            # Pages that get a [Page N] marker (not the first or the last two)
+            marker_pages = set(pages_to_extract) - {0, num_pages-1, num_pages-2}
+            
+            # Extract text from selected pages, writing each page as soon as it is read
             for page_num in pages_to_extract:
-                page = reader.pages[page_num]
-                extracted = page.extract_text()
-                if page_num > 0 and page_num not in [num_pages-1, num_pages-2]:
-                    text += f"\n\n[Page {page_num+1}]\n\n"
-                text += extracted + "\n\n"
+                extracted = pdf_document[page_num].get_text()
+                if page_num in marker_pages:
+                    parts.append(f"\n\n[Page {page_num+1}]\n\n")
+                    output_file.write(parts[-1])
+                parts.append(extracted + "\n\n")
+                output_file.write(parts[-1])
             
             # Add note about fast mode
             if num_pages > 10:
-                text += "\n\n[NOTE: This is a fast preview translation. Only selected pages were processed.]\n\n"
-                
-        # Write text to output file
-        with open(output_path, 'w', encoding='utf-8') as output_file:
-            output_file.write(text)
+                parts.append("\n\n[NOTE: This is a fast preview translation. Only selected pages were processed.]\n\n")
+                output_file.write(parts[-1])
+        
+        save_pdf_result(pdf_path, 'extract_text', "".join(parts))
         
         print(f"Text extraction completed, saved to {output_path}")    
         return True
@@ -144,17 +265,121 @@ def extract_text(pdf_path, output_path):
         print(f"Error extracting text: {e}", file=sys.stderr)
         return False
 
+# Common OCR confusions inside words: pipe for capital I, zero for capital O, one for lowercase L
+_OCR_FIXUPS = {'|': 'I', '0': 'O', '1': 'l'}
+_OCR_FIXUPS_RE = re.compile(r'(?<=[A-Za-z])([01|])(?=[A-Za-z])')
+
+# Per-process Tesseract engine (None until first use, False if tesserocr is unavailable)
+_tess_api = None
+
+def _get_tess_api():
+    """Return this process's resident tesserocr engine, or None to fall back to pytesseract"""
+    global _tess_api
+    if _tess_api is None:
+        _tess_api = False
+        if PyTessBaseAPI is not None:
+            try:
+                _tess_api = PyTessBaseAPI(lang='eng', oem=OEM.LSTM_ONLY, psm=PSM.AUTO)
+            except Exception as e:
+                print(f"Could not start tesserocr, using pytesseract: {e}")
+    return _tess_api or None
+
+def ocr_image(image, config='--oem 1 --psm 3'):
+    """OCR a page image, reusing the in-process engine when available"""
+    api = _get_tess_api()
+    if api is not None:
+        try:
+            api.SetImage(image)
+            return api.GetUTF8Text()
+        except Exception as e:
+            print(f"tesserocr failed: {e}, falling back to pytesseract")
+    return pytesseract.image_to_string(image, config=config)
+
+def preprocess_for_ocr(image):
+    """Boost contrast and sharpen a page image before OCR"""
+    if cv2 is not None:
+        # Grayscale + adaptive histogram equalization + 3x3 sharpen, all in OpenCV
+        gray = cv2.cvtColor(np.asarray(image.convert('RGB')), cv2.COLOR_RGB2GRAY)
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        equalized = clahe.apply(gray)
+        kernel = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]], np.float32)
+        sharpened = cv2.filter2D(equalized, -1, kernel)
+        from PIL import Image
+        return Image.fromarray(sharpened)
+    
+    from PIL import ImageEnhance
+    
+    # Enhance image contrast
+    enhancer = ImageEnhance.Contrast(image)
+    enhanced_image = enhancer.enhance(1.5)  # Increase contrast by 50%
+    
+    # Sharpen image
+    enhancer = ImageEnhance.Sharpness(enhanced_image)
+    return enhancer.enhance(1.5)  # Increase sharpness by 50%
+
+def _init_ocr_worker():
+    """Limit Tesseract to a single thread in each OCR worker process"""
+    # Several single-threaded Tesseract processes are faster than one process using OpenMP
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+
+def _ocr_page(pdf_path, page_index, dpi):
+    """Rasterize and OCR a single PDF page, returning (page_index, page_text)"""
+    # Spill the raster to a temporary folder instead of holding the decoded image in memory
+    # (a single page is rendered, so pdftoppm only needs one thread)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        images = convert_from_path(
+            pdf_path,
+            dpi=dpi,
+            first_page=page_index+1,
+            last_page=page_index+1,
+            thread_count=1,
+            output_folder=tmpdir
+        )
+        if not images:
+            return page_index, ""
+        image = images[0]
+        
+        # Preprocess image for better OCR results
+        try:
+            enhanced_image = preprocess_for_ocr(image)
+            
+            # Use balanced OCR settings for better accuracy
+            # --oem 1: LSTM engine only (more accurate)
+            # --psm 3: Auto page segmentation
+            config = '--oem 1 --psm 3'
+            
+            # Perform OCR on enhanced image
+            page_text = ocr_image(enhanced_image, config=config)
+        except Exception as preprocess_error:
+            print(f"Image preprocessing failed: {preprocess_error}, using original image")
+            # Fallback to original image with simpler settings
+            config = '--oem 0 --psm 3'
+            page_text = pytesseract.image_to_string(image, config=config)
+        
+        return page_index, page_text
+
 def extract_text_with_ocr(pdf_path, output_path):
     """Extract text from a PDF file using OCR with improved quality and speed balance"""
     try:
         print(f"Starting OCR text extraction for {pdf_path}")
-        text = ""
+        parts = []
+        
+        # OCR is the slowest step, so reuse a previous run on a PDF with the same content
+        cached_text = get_pdf_result(pdf_path, 'extract_text_with_ocr')
+        if cached_text is not None:
+            print(f"Using cached OCR text for {pdf_path}")
+            with open(output_path, 'w', encoding='utf-8') as output_file:
+                output_file.write(cached_text)
+            return True
         
         # Use higher DPI for better OCR quality
         # 300 DPI is a good balance between quality and speed
-        images = convert_from_path(pdf_path, dpi=300)
+        dpi = 300
         
-        total_pages = len(images)
+        # Pages are rasterized inside the OCR workers, so only the page count is needed here
+        # PyMuPDF reads it from the page tree without spawning pdfinfo
+        with fitz.open(pdf_path) as pdf_document:
+            total_pages = pdf_document.page_count
         print(f"PDF has {total_pages} pages to process")
         
         # Determine how many pages to process based on document size
@@ -192,59 +417,43 @@ def extract_text_with_ocr(pdf_path, output_path):
         # Remove duplicates and sort
         pages_to_process = sorted(list(set(pages_to_process)))
         
-        # Process selected pages with OCR
-        for idx, i in enumerate(pages_to_process):
-            if i >= total_pages:
-                continue
-                
-            image = images[i]
-            print(f"OCR processing page {i+1}/{total_pages} ({idx+1}/{len(pages_to_process)})")
-            
-            # Preprocess image for better OCR results
-            try:
-                # Convert to numpy array
-                import numpy as np
-                from PIL import Image, ImageEnhance
-                
-                # Enhance image contrast
-                enhancer = ImageEnhance.Contrast(image)
-                enhanced_image = enhancer.enhance(1.5)  # Increase contrast by 50%
-                
-                # Sharpen image
-                enhancer = ImageEnhance.Sharpness(enhanced_image)
-                enhanced_image = enhancer.enhance(1.5)  # Increase sharpness by 50%
-                
-                # Use balanced OCR settings for better accuracy
-                # --oem 1: LSTM engine only (more accurate)
-                # --psm 3: Auto page segmentation
-                config = '--oem 1 --psm 3'
-                
-                # Perform OCR on enhanced image
-                page_text = pytesseract.image_to_string(enhanced_image, config=config)
-            except Exception as preprocess_error:
-                print(f"Image preprocessing failed: {preprocess_error}, using original image")
-                # Fallback to original image with simpler settings
-                config = '--oem 0 --psm 3'
-                page_text = pytesseract.image_to_string(image, config=config)
+        # OCR the selected pages in parallel worker processes
+        pages_to_process = [i for i in pages_to_process if i < total_pages]
+        page_texts = {}
+        max_workers = max(1, min(os.cpu_count() or 1, len(pages_to_process)))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, initializer=_init_ocr_worker) as executor:
+            future_to_page = {
+                executor.submit(_ocr_page, pdf_path, i, dpi): i for i in pages_to_process
+            }
             
+            for idx, future in enumerate(concurrent.futures.as_completed(future_to_page)):
+                i, page_text = future.result()
+                page_texts[i] = page_text
+                print(f"OCR processed page {i+1}/{total_pages} ({idx+1}/{len(pages_to_process)})")
+        
+        # Assemble the text in page order so the output is deterministic
+        for i in sorted(page_texts):
             # Add page marker except for first page
             if i > 0:
-                text += f"\n\n[Page {i+1}]\n\n"
+                parts.append(f"\n\n[Page {i+1}]\n\n")
             
-            text += page_text + "\n\n"
+            parts.append(page_texts[i] + "\n\n")
         
         # Add note about partial processing if we skipped pages
         if len(pages_to_process) < total_pages:
-            text += "\n\n[NOTE: This is a partial translation. Only selected pages were processed using OCR.]\n\n"
+            parts.append("\n\n[NOTE: This is a partial translation. Only selected pages were processed using OCR.]\n\n")
+        
+        text = "".join(parts)
         
         # Clean up the extracted text
         # Remove excessive newlines
         text = re.sub(r'\n{3,}', '\n\n', text)
         
-        # Fix common OCR errors
-        text = text.replace('|', 'I')  # Common OCR error: pipe instead of capital I
-        text = text.replace('0', 'O')  # Common OCR error: zero instead of capital O
-        text = text.replace('1', 'l')  # Common OCR error: one instead of lowercase L
+        # Fix common OCR errors, but only inside words so numbers, dates and
+        # page markers are left untouched
+        text = _OCR_FIXUPS_RE.sub(lambda m: _OCR_FIXUPS[m.group(1)], text)
+        
+        save_pdf_result(pdf_path, 'extract_text_with_ocr', text)
         
         # Write text to output file
         with open(output_path, 'w', encoding='utf-8') as output_file:
@@ -258,48 +467,46 @@ def extract_text_with_ocr(pdf_path, output_path):
         traceback.print_exc()
         return False
 
+_pdf_probe_cache = {}
+
+def _probe_pdf(pdf_path):
+    """Read the text of the first few pages once, returning (sample_text, needs_ocr, pdf_basename)"""
+    pdf_basename = os.path.basename(pdf_path)
+    try:
+        key = (os.path.abspath(pdf_path), os.path.getmtime(pdf_path))
+    except OSError:
+        key = None
+    
+    if key in _pdf_probe_cache:
+        return _pdf_probe_cache[key]
+    
+    # Errors are left to the caller, so an unreadable PDF isn't mistaken for one without text
+    parts = []
+    with fitz.open(pdf_path) as pdf_document:
+        # Check a sample of pages (up to 5)
+        for i in range(min(5, pdf_document.page_count)):
+            parts.append(pdf_document[i].get_text())
+    
+    sample_text = "\n".join(parts)
+    result = (sample_text, len(sample_text) < 200, pdf_basename)
+    if key is not None:
+        _pdf_probe_cache[key] = result
+    return result
+
 def needs_ocr(pdf_path):
     """Check if a PDF needs OCR by examining if it has extractable text"""
+    result = _needs_ocr(pdf_path)
+    # Default to using OCR if we can't determine
+    return True if result is None else result
+
+@memoize_pdf_result
+def _needs_ocr(pdf_path):
+    """Decide whether a PDF needs OCR, returning None if the check failed"""
     try:
-        # Try multiple extraction methods to determine if OCR is needed
-        
-        # Method 1: PyPDF2 extraction
-        pypdf_text = ""
-        try:
-            with open(pdf_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                
-                # Check a sample of pages (up to 5)
-                pages_to_check = min(5, len(reader.pages))
-                
-                for i in range(pages_to_check):
-                    page = reader.pages[i]
-                    text = page.extract_text()
-                    pypdf_text += text
-        except Exception as e:
-            print(f"PyPDF2 extraction error: {e}")
-        
-        # Method 2: PyMuPDF (fitz) extraction
-        fitz_text = ""
-        try:
-            pdf_document = fitz.open(pdf_path)
-            
-            # Check a sample of pages (up to 5)
-            pages_to_check = min(5, len(pdf_document))
-            
-            for i in range(pages_to_check):
-                page = pdf_document[i]
-                fitz_text += page.get_text()
-                
-            pdf_document.close()
-        except Exception as e:
-            print(f"PyMuPDF extraction error: {e}")
-        
-        # Combine results from both methods
-        total_text = pypdf_text + fitz_text
+        total_text, little_text, _ = _probe_pdf(pdf_path)
         
         # If we extracted a reasonable amount of text, OCR is likely not needed
-        if len(total_text) > 200:  # Increased threshold for better detection
+        if not little_text:
             print(f"PDF has extractable text ({len(total_text)} chars), OCR not needed")
             return False
             
@@ -308,90 +515,155 @@ def needs_ocr(pdf_path):
         
         # Convert first page to image and try OCR on a small sample
         try:
-            images = convert_from_path(pdf_path, dpi=150, first_page=1, last_page=1)
-            if images:
-                # Use fast OCR settings
-                config = '--oem 0 --psm 3'
-                sample_text = pytesseract.image_to_string(images[0], config=config)
-                
-                # If OCR found significant text that wasn't found by text extraction
-                if len(sample_text) > 100 and len(total_text) < 50:
-                    print(f"OCR sample found {len(sample_text)} chars, OCR is needed")
-                    return True
+            with tempfile.TemporaryDirectory() as tmpdir:
+                images = convert_from_path(
+                    pdf_path,
+                    dpi=150,
+                    first_page=1,
+                    last_page=1,
+                    thread_count=1,
+                    output_folder=tmpdir
+                )
+                if images:
+                    # Use fast OCR settings
+                    config = '--oem 0 --psm 3'
+                    sample_text = ocr_image(images[0], config=config)
+                    
+                    # If OCR found significant text that wasn't found by text extraction
+                    if len(sample_text) > 100 and len(total_text) < 50:
+                        print(f"OCR sample found {len(sample_text)} chars, OCR is needed")
+                        return True
         except Exception as e:
             print(f"OCR sample check error: {e}")
+            return None
         
         # Default decision based on extracted text
-        needs_ocr = len(total_text) < 200
+        needs_ocr = little_text
         print(f"Final OCR decision: {'OCR needed' if needs_ocr else 'OCR not needed'}")
         return needs_ocr
         
     except Exception as e:
         print(f"Error checking if PDF needs OCR: {e}", file=sys.stderr)
-        return True  # Default to using OCR if we can't determine
+        return None
+
+# Language names and native spellings that identify a language from a filename
+FILENAME_LANGUAGE_INDICATORS = {
+    'es': ['spanish', 'español', 'espanol', 'castellano'],
+    'fr': ['french', 'français', 'francais'],
+    'de': ['german', 'deutsch', 'germanisch'],
+    'it': ['italian', 'italiano'],
+    'pt': ['portuguese', 'português', 'portugues'],
+    'ja': ['japanese', 'japonés', 'japones', '日本語'],
+    'zh': ['chinese', 'mandarin', '中文', '汉语', '漢語'],
+    'ru': ['russian', 'русский', 'russkiy'],
+    'ar': ['arabic', 'العربية', 'arabisch'],
+    'hi': ['hindi', 'हिंदी'],
+    'ko': ['korean', '한국어', 'corean'],
+    'nl': ['dutch', 'nederlands', 'hollandais'],
+    'pl': ['polish', 'polski', 'polaco'],
+    'tr': ['turkish', 'türkçe', 'turkce'],
+    'sv': ['swedish', 'svenska'],
+    'en': ['english', 'inglés', 'ingles']
+}
+
+# Common short words used to score the language of extracted text
+TEXT_LANGUAGE_INDICATORS = {
+    'es': ['la', 'el', 'en', 'por', 'con', 'para', 'una', 'que', 'es', 'y', 'de', 'los', 'las', 'del', 'como', 'más'],
+    'fr': ['le', 'la', 'les', 'des', 'un', 'une', 'et', 'est', 'pour', 'dans', 'avec', 'ce', 'cette', 'ces', 'nous', 'vous'],
+    'de': ['der', 'die', 'das', 'und', 'ist', 'für', 'mit', 'ein', 'eine', 'zu', 'von', 'nicht', 'auch', 'dem', 'sich', 'auf', 'dass', 'wenn', 'werden', 'sind'],
+    'it': ['il', 'la', 'i', 'le', 'un', 'una', 'e', 'è', 'per', 'con', 'che', 'di', 'non', 'sono', 'questo', 'questa'],
+    'pt': ['o', 'a', 'os', 'as', 'um', 'uma', 'e', 'é', 'para', 'com', 'que', 'de', 'não', 'em', 'por', 'se'],
+    'ja': ['は', 'の', 'に', 'を', 'た', 'が', 'で', 'て', 'と', 'れ', 'から', 'まで', 'です', 'ます'],
+    'zh': ['的', '是', '在', '了', '和', '有', '我', '不', '这', '为', '他', '人', '你', '个'],
+    'ru': ['и', 'в', 'не', 'на', 'я', 'что', 'с', 'по', 'это', 'от', 'к', 'но', 'а', 'у'],
+    'nl': ['de', 'het', 'een', 'en', 'van', 'in', 'is', 'dat', 'op', 'te', 'voor', 'met', 'zijn', 'niet'],
+    'en': ['the', 'and', 'is', 'in', 'to', 'of', 'a', 'for', 'that', 'with', 'as', 'at', 'this', 'by', 'are', 'be']
+}
+
+# One whole-word alternation per language, compiled once at import
+_LANG_INDICATOR_RE = {
+    lang: re.compile(r'\b(?:' + '|'.join(re.escape(word) for word in words) + r')\b')
+    for lang, words in TEXT_LANGUAGE_INDICATORS.items()
+}
+
+_NON_WORD_RE = re.compile(r'\W+')
+
+def _build_indicator_automaton():
+    """Build one Aho-Corasick automaton over all text indicators (None if pyahocorasick is missing)"""
+    if ahocorasick is None:
+        return None
+    
+    # A word can be an indicator for several languages
+    word_langs = {}
+    for lang, words in TEXT_LANGUAGE_INDICATORS.items():
+        for word in set(words):
+            word_langs.setdefault(word, []).append(lang)
+    
+    # Surrounding spaces make each key match whole words only
+    automaton = ahocorasick.Automaton()
+    for word, langs in word_langs.items():
+        automaton.add_word(f" {word} ", tuple(langs))
+    automaton.make_automaton()
+    return automaton
+
+_LANG_INDICATOR_AUTOMATON = _build_indicator_automaton()
+
+def score_language_indicators(sample_lower):
+    """Count whole-word language indicator matches in lowercased text, per language"""
+    if _LANG_INDICATOR_AUTOMATON is None:
+        return {lang: len(pattern.findall(sample_lower)) for lang, pattern in _LANG_INDICATOR_RE.items()}
+    
+    # Collapse every non-word run to one space so word boundaries match the regex fallback
+    haystack = " " + _NON_WORD_RE.sub(" ", sample_lower) + " "
+    language_scores = dict.fromkeys(TEXT_LANGUAGE_INDICATORS, 0)
+    for _, langs in _LANG_INDICATOR_AUTOMATON.iter(haystack):
+        for lang in langs:
+            language_scores[lang] += 1
+    return language_scores
 
 def detect_language(pdf_path):
     """Detect the language of a PDF document using multiple methods for reliability"""
+    pdf_basename = os.path.basename(pdf_path)
+    print(f"Detecting language for PDF: {pdf_basename}")
+    
+    # First check for language indicators in filename
+    filename_lower = pdf_basename.lower()
+    
+    # Check filename for language indicators (every run, since copies of a PDF can be named differently)
+    for lang_code, indicators in FILENAME_LANGUAGE_INDICATORS.items():
+        indicator = next((ind for ind in indicators if ind in filename_lower), None)
+        if indicator:
+            print(f"FILENAME HINT: Detected {lang_code} from indicator '{indicator}' in filename: {pdf_basename}")
+            return lang_code
+    
+    # Use auto-detection if the text gives no clear answer
+    return _detect_text_language(pdf_path) or "auto"
+
+@memoize_pdf_result
+def _detect_text_language(pdf_path):
+    """Detect the language of a PDF's text, returning None if it can't be determined"""
     try:
-        pdf_basename = os.path.basename(pdf_path)
-        print(f"Detecting language for PDF: {pdf_basename}")
-        
-        # First check for language indicators in filename
-        filename_lower = pdf_basename.lower()
-        
-        # Comprehensive language detection from filename
-        language_indicators = {
-            'es': ['spanish', 'español', 'espanol', 'castellano'],
-            'fr': ['french', 'français', 'francais'],
-            'de': ['german', 'deutsch', 'germanisch'],
-            'it': ['italian', 'italiano'],
-            'pt': ['portuguese', 'português', 'portugues'],
-            'ja': ['japanese', 'japonés', 'japones', '日本語'],
-            'zh': ['chinese', 'mandarin', '中文', '汉语', '漢語'],
-            'ru': ['russian', 'русский', 'russkiy'],
-            'ar': ['arabic', 'العربية', 'arabisch'],
-            'hi': ['hindi', 'हिंदी'],
-            'ko': ['korean', '한국어', 'corean'],
-            'nl': ['dutch', 'nederlands', 'hollandais'],
-            'pl': ['polish', 'polski', 'polaco'],
-            'tr': ['turkish', 'türkçe', 'turkce'],
-            'sv': ['swedish', 'svenska'],
-            'en': ['english', 'inglés', 'ingles']
-        }
-        
-        # Check filename for language indicators
-        for lang_code, indicators in language_indicators.items():
-            for indicator in indicators:
-                if indicator in filename_lower:
-                    print(f"FILENAME HINT: Detected {lang_code} from indicator '{indicator}' in filename: {pdf_basename}")
-                    return lang_code
-        
-        # Create a temporary directory for our extraction files
-        temp_dir = tempfile.mkdtemp()
-        text_path = os.path.join(temp_dir, f"extract-{uuid.uuid4()}.txt")
-        ocr_text_path = os.path.join(temp_dir, f"ocr-extract-{uuid.uuid4()}.txt")
-        
-        # Extract text using both methods to ensure we get enough content for detection
-        direct_extraction_text = ""
+        # Reuse the text read by the PDF probe instead of extracting again
+        direct_extraction_text, _, _ = _probe_pdf(pdf_path)
         ocr_extraction_text = ""
+        print(f"Direct extraction produced {len(direct_extraction_text)} characters")
         
-        # Try direct extraction first
-        try:
-            if extract_text(pdf_path, text_path):
-                with open(text_path, 'r', encoding='utf-8', errors='ignore') as file:
-                    direct_extraction_text = file.read()
-                print(f"Direct extraction produced {len(direct_extraction_text)} characters")
-        except Exception as e:
-            print(f"Direct extraction failed: {e}")
-        
-        # Also try OCR extraction
-        try:
-            extract_text_with_ocr(pdf_path, ocr_text_path)
-            with open(ocr_text_path, 'r', encoding='utf-8', errors='ignore') as file:
-                ocr_extraction_text = file.read()
-            print(f"OCR extraction produced {len(ocr_extraction_text)} characters")
-        except Exception as e:
-            print(f"OCR extraction failed: {e}")
+        # Only fall back to OCR when direct extraction found little text
+        # Language detection needs a few hundred characters, so the first two pages
+        # at low resolution are enough; OCR them side by side in separate processes
+        if len(direct_extraction_text.strip()) > 500:
+            print("Direct extraction has enough text, skipping OCR")
+        else:
+            try:
+                with fitz.open(pdf_path) as pdf_document:
+                    pages_to_ocr = list(range(min(2, pdf_document.page_count)))
+                if pages_to_ocr:
+                    with concurrent.futures.ProcessPoolExecutor(max_workers=len(pages_to_ocr), initializer=_init_ocr_worker) as executor:
+                        results = executor.map(_ocr_page, [pdf_path] * len(pages_to_ocr), pages_to_ocr, [150] * len(pages_to_ocr))
+                        ocr_extraction_text = "\n".join(page_text for _, page_text in results)
+                print(f"OCR extraction produced {len(ocr_extraction_text)} characters")
+            except Exception as e:
+                print(f"OCR extraction failed: {e}")
         
         # Use the text source with more content
         if len(direct_extraction_text.strip()) > len(ocr_extraction_text.strip()):
@@ -401,45 +673,18 @@ def detect_language(pdf_path):
             text = ocr_extraction_text
             print("Using OCR extraction text for language detection")
         
-        # Clean up temporary files
-        try:
-            import shutil
-            shutil.rmtree(temp_dir)
-        except:
-            pass
-        
         if not text.strip():
             print("No text content found for language detection", file=sys.stderr)
-            return "auto"  # Use auto-detection if no text was extracted
+            return None
         
         # Detect language using multiple methods for reliability
         try:
             # Get a sample of the text (up to 5000 chars) for faster detection
             sample_text = text[:5000]
             
-            # Dictionary of language indicators with their key words
-            language_indicators = {
-                'es': ['la', 'el', 'en', 'por', 'con', 'para', 'una', 'que', 'es', 'y', 'de', 'los', 'las', 'del', 'como', 'más'],
-                'fr': ['le', 'la', 'les', 'des', 'un', 'une', 'et', 'est', 'pour', 'dans', 'avec', 'ce', 'cette', 'ces', 'nous', 'vous'],
-                'de': ['der', 'die', 'das', 'und', 'ist', 'für', 'mit', 'ein', 'eine', 'zu', 'von', 'nicht', 'auch', 'dem', 'sich', 'auf', 'dass', 'wenn', 'werden', 'sind'],
-                'it': ['il', 'la', 'i', 'le', 'un', 'una', 'e', 'è', 'per', 'con', 'che', 'di', 'non', 'sono', 'questo', 'questa'],
-                'pt': ['o', 'a', 'os', 'as', 'um', 'uma', 'e', 'é', 'para', 'com', 'que', 'de', 'não', 'em', 'por', 'se'],
-                'ja': ['は', 'の', 'に', 'を', 'た', 'が', 'で', 'て', 'と', 'れ', 'から', 'まで', 'です', 'ます'],
-                'zh': ['的', '是', '在', '了', '和', '有', '我', '不', '这', '为', '他', '人', '你', '个'],
-                'ru': ['и', 'в', 'не', 'на', 'я', 'что', 'с', 'по', 'это', 'от', 'к', 'но', 'а', 'у'],
-                'nl': ['de', 'het', 'een', 'en', 'van', 'in', 'is', 'dat', 'op', 'te', 'voor', 'met', 'zijn', 'niet'],
-                'en': ['the', 'and', 'is', 'in', 'to', 'of', 'a', 'for', 'that', 'with', 'as', 'at', 'this', 'by', 'are', 'be']
-            }
-            
             # Count indicators for each language
-            language_scores = {}
-            for lang, indicators in language_indicators.items():
-                score = 0
-                for word in indicators:
-                    # Count times each word appears as whole word with boundaries
-                    count = len(re.findall(r'\b' + word + r'\b', sample_text.lower()))
-                    score += count
-                language_scores[lang] = score
+            language_scores = score_language_indicators(sample_text.lower())
+            for lang, score in language_scores.items():
                 print(f"Language indicator score for {lang}: {score}")
             
             # Get the language with the highest score
@@ -493,8 +738,8 @@ def detect_language(pdf_path):
                     lang = max(lang_votes.items(), key=lambda x: x[1])[0]
                     print(f"Langdetect final result: {lang} (votes: {lang_votes})")
                 else:
-                    lang = "auto"
                     print("Langdetect failed on all samples")
+                    return None
                 
                 # Apply rules to fix common detection errors
                 if lang == "ca":  # If detected as Catalan
@@ -505,17 +750,88 @@ def detect_language(pdf_path):
             except Exception as e:
                 print(f"Langdetect failed: {e}")
                 
-            # If all detection methods fail, return auto
-            return "auto"
+            # If all detection methods fail, leave it undecided
+            return None
             
         except Exception as e:
             print(f"Language detection failed: {e}", file=sys.stderr)
-            return "auto"  # Use auto-detection if detection fails
+            return None
     except Exception as e:
         print(f"Error in language detection process: {e}", file=sys.stderr)
         import traceback
         traceback.print_exc()
-        return "auto"  # Use auto-detection on error
+        return None
+
+# Map of special cases and alternate language codes
+LANGUAGE_CODE_MAP = {
+    # Chinese variants
+    'zh-cn': 'zh-CN',
+    'zh-tw': 'zh-TW',
+    'zh-hans': 'zh-CN',
+    'zh-hant': 'zh-TW',
+    'zh': 'zh-CN',
+    'chinese': 'zh-CN',
+    'chinese simplified': 'zh-CN',
+    'chinese traditional': 'zh-TW',
+    
+    # Hebrew
+    'iw': 'he',
+    'hebrew': 'he',
+    
+    # Javanese
+    'jw': 'jv',
+    'javanese': 'jv',
+    
+    # Norwegian variants
+    'nb': 'no',
+    'nn': 'no',
+    'norwegian': 'no',
+    'norwegian bokmål': 'no',
+    'norwegian nynorsk': 'no',
+    
+    # Filipino/Tagalog
+    'fil': 'tl',
+    'filipino': 'tl',
+    'tagalog': 'tl',
+    
+    # Common language names to codes
+    'english': 'en',
+    'spanish': 'es',
+    'french': 'fr',
+    'german': 'de',
+    'italian': 'it',
+    'portuguese': 'pt',
+    'russian': 'ru',
+    'japanese': 'ja',
+    'korean': 'ko',
+    'arabic': 'ar',
+    'hindi': 'hi',
+    'bengali': 'bn',
+    'dutch': 'nl',
+    'turkish': 'tr',
+    'vietnamese': 'vi',
+    'thai': 'th',
+    'persian': 'fa',
+    'polish': 'pl',
+    'ukrainian': 'uk',
+    'swedish': 'sv',
+    'finnish': 'fi',
+    'danish': 'da',
+    'greek': 'el',
+    'czech': 'cs',
+    'hungarian': 'hu',
+    'romanian': 'ro',
+    
+    # Special cases for common errors
+    'auto-detect': 'auto',
+    'automatic': 'auto',
+    'unknown': 'auto',
+    'ca': 'es',  # Treat Catalan as Spanish for better results
+}
+
+# ISO 639-1 code, optionally with a region (e.g. en-us)
+_RE_ISO2 = re.compile(r'\b([a-z]{2})\b')
+_RE_ISO2_REGION = re.compile(r'\b([a-z]{2})-([a-z]{2})\b')
 
 def format_language_code(code):
     """Format language code properly for Google Translator API"""
@@ -525,91 +841,21 @@ def format_language_code(code):
     if code == 'auto' or not code:
         return 'auto'
     
-    # Map of special cases and alternate codes
-    language_map = {
-        # Chinese variants
-        'zh-cn': 'zh-CN',
-        'zh-tw': 'zh-TW',
-        'zh-hans': 'zh-CN',
-        'zh-hant': 'zh-TW',
-        'zh': 'zh-CN',
-        'chinese': 'zh-CN',
-        'chinese simplified': 'zh-CN',
-        'chinese traditional': 'zh-TW',
-        
-        # Hebrew
-        'iw': 'he',
-        'hebrew': 'he',
-        
-        # Javanese
-        'jw': 'jv',
-        'javanese': 'jv',
-        
-        # Norwegian variants
-        'nb': 'no',
-        'nn': 'no',
-        'norwegian': 'no',
-        'norwegian bokmål': 'no',
-        'norwegian nynorsk': 'no',
-        
-        # Filipino/Tagalog
-        'fil': 'tl',
-        'filipino': 'tl',
-        'tagalog': 'tl',
-        
-        # Common language names to codes
-        'english': 'en',
-        'spanish': 'es',
-        'french': 'fr',
-        'german': 'de',
-        'italian': 'it',
-        'portuguese': 'pt',
-        'russian': 'ru',
-        'japanese': 'ja',
-        'korean': 'ko',
-        'arabic': 'ar',
-        'hindi': 'hi',
-        'bengali': 'bn',
-        'dutch': 'nl',
-        'turkish': 'tr',
-        'vietnamese': 'vi',
-        'thai': 'th',
-        'persian': 'fa',
-        'polish': 'pl',
-        'ukrainian': 'uk',
-        'swedish': 'sv',
-        'finnish': 'fi',
-        'danish': 'da',
-        'greek': 'el',
-        'czech': 'cs',
-        'hungarian': 'hu',
-        'romanian': 'ro',
-        
-        # Special cases for common errors
-        'auto-detect': 'auto',
-        'automatic': 'auto',
-        'unknown': 'auto',
-        'ca': 'es',  # Treat Catalan as Spanish for better results
-    }
-    
     # Check if we have a special mapping
     lower_code = code.lower() if isinstance(code, str) else ''
-    if lower_code in language_map:
-        return language_map[lower_code]
+    if lower_code in LANGUAGE_CODE_MAP:
+        return LANGUAGE_CODE_MAP[lower_code]
     
     # Try to clean up the code if it contains extraneous information
     if isinstance(code, str) and len(code) > 2:
-        # Try to extract a code pattern
-        import re
-        
         # Look for ISO 639-1 code pattern (2 letters)
-        match = re.search(r'\b([a-z]{2})\b', lower_code)
+        match = _RE_ISO2.search(lower_code)
         if match:
             extracted = match.group(1)
             return extracted
             
         # Look for language code with region (e.g., en-us)
-        match = re.search(r'\b([a-z]{2})-([a-z]{2})\b', lower_code)
+        match = _RE_ISO2_REGION.search(lower_code)
         if match:
             lang = match.group(1)
             region = match.group(2)
@@ -637,54 +883,269 @@ def format_language_code(code):
 CACHE_DIR = os.path.join(tempfile.gettempdir(), "pdf_translator_cache")
 os.makedirs(CACHE_DIR, exist_ok=True)
 
-def get_cache_path(source_lang, target_lang):
-    """Get the path to the translation cache file for the given language pair"""
-    cache_filename = f"translation_cache_{source_lang}_{target_lang}.json"
-    return os.path.join(CACHE_DIR, cache_filename)
+# Persistent translation cache shared by all threads of this process
+CACHE_SCHEMA_VERSION = "5"
+CACHE_DB_PATH = os.path.join(CACHE_DIR, "cache.db")
+# Results of needs_ocr, detect_language and text extraction older than this are dropped
+PDF_RESULT_TTL = 30 * 24 * 3600
 
-def load_translation_cache(source_lang, target_lang):
-    """Load the translation cache for the given language pair"""
-    cache_path = get_cache_path(source_lang, target_lang)
-    if os.path.exists(cache_path):
-        try:
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading translation cache: {e}")
-    return {}
+def _open_cache_db():
+    """Open the cache database, dropping tables of an older CACHE_SCHEMA_VERSION and creating missing ones"""
+    db = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+    # WAL lets the CLI processes of concurrent jobs read while another one writes
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    # Superseded by the tr table (keys there are raw digests, not hex strings)
+    db.execute("DROP TABLE IF EXISTS t")
+    # Entries are keyed by content hash, so they never go stale on their own; bump
+    # CACHE_SCHEMA_VERSION when the key format, table layout or translation pipeline changes
+    # to drop them once
+    db.execute("CREATE TABLE IF NOT EXISTS meta(k TEXT PRIMARY KEY, v TEXT)")
+    row = db.execute("SELECT v FROM meta WHERE k='schema_version'").fetchone()
+    if row is None or row[0] != CACHE_SCHEMA_VERSION:
+        db.execute("DROP TABLE IF EXISTS tr")
+        db.execute("DROP TABLE IF EXISTS pdf_results")
+        db.execute("INSERT OR REPLACE INTO meta(k, v) VALUES ('schema_version', ?)", (CACHE_SCHEMA_VERSION,))
+    # used is the last time (epoch seconds) an entry was written or read from disk, for LRU eviction
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS tr(src TEXT, tgt TEXT, h BLOB, txt TEXT, used INTEGER, PRIMARY KEY (src, tgt, h))"
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS tr_used ON tr(used)")
+    # Scratch table for looking up many hashes with a single join
+    db.execute("CREATE TEMP TABLE IF NOT EXISTS q(h BLOB PRIMARY KEY)")
+    # PDF results keyed by fingerprint; ts is when the result was stored
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS pdf_results(fp TEXT, name TEXT, val TEXT, ts INTEGER, PRIMARY KEY (fp, name))"
+    )
+    db.commit()
+    return db
+
+_CACHE_DB = _open_cache_db()
+_CACHE_LOCK = threading.Lock()
+
+# Recently used translations are kept in memory in front of SQLite, keyed by (src, tgt, hash);
+# new translations are written back in batches of CACHE_COMMIT_EVERY with one executemany.
+# On disk, the least recently used entries beyond DISK_CACHE_MAXSIZE are evicted on flush
+MEM_CACHE_MAXSIZE = 100_000
+DISK_CACHE_MAXSIZE = 1_000_000
+CACHE_COMMIT_EVERY = 50
+_mem_cache = OrderedDict()
+_dirty_translations = []
+# Disk entries read this process, whose used time is updated with the next write
+_touched_translations = []
+
+def hash_text(text):
+    """Cache key for a piece of text: 8-byte xxh3 digest if xxhash is installed, otherwise 16-byte BLAKE2b"""
+    data = text.encode('utf-8')
+    if xxhash is not None:
+        return xxhash.xxh3_64_digest(data)
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def _mem_cache_set(key, translated):
+    """Insert into the in-memory LRU, evicting the least recently used entry when full (caller holds the lock)"""
+    _mem_cache[key] = translated
+    _mem_cache.move_to_end(key)
+    if len(_mem_cache) > MEM_CACHE_MAXSIZE:
+        _mem_cache.popitem(last=False)
 
-def save_translation_cache(cache, source_lang, target_lang):
-    """Save the translation cache for the given language pair"""
-    cache_path = get_cache_path(source_lang, target_lang)
+def _write_dirty_translations():
+    """Write pending translations and access times to SQLite and commit (caller holds the lock)"""
+    now = int(time.time())
+    if _dirty_translations:
+        _CACHE_DB.executemany(
+            "INSERT OR REPLACE INTO tr(src, tgt, h, txt, used) VALUES (?, ?, ?, ?, ?)",
+            (row + (now,) for row in _dirty_translations)
+        )
+        _dirty_translations.clear()
+    if _touched_translations:
+        _CACHE_DB.executemany(
+            "UPDATE tr SET used=? WHERE src=? AND tgt=? AND h=?",
+            ((now,) + key for key in _touched_translations)
+        )
+        _touched_translations.clear()
+    _CACHE_DB.commit()
+
+def _evict_translations():
+    """Delete the least recently used disk entries beyond DISK_CACHE_MAXSIZE (caller holds the lock)"""
+    excess = _CACHE_DB.execute("SELECT COUNT(*) FROM tr").fetchone()[0] - DISK_CACHE_MAXSIZE
+    if excess > 0:
+        _CACHE_DB.execute(
+            "DELETE FROM tr WHERE rowid IN (SELECT rowid FROM tr ORDER BY used LIMIT ?)",
+            (excess,)
+        )
+        _CACHE_DB.commit()
+        print(f"Evicted {excess} least recently used translations from the cache")
+
+def get_cached_translation(text, source_lang, target_lang, text_hash=None):
+    """Look up a cached translation, returning None on a miss"""
+    if text_hash is None:
+        text_hash = hash_text(text)
+    key = (source_lang, target_lang, text_hash)
     try:
-        with open(cache_path, 'w', encoding='utf-8') as f:
-            json.dump(cache, f, ensure_ascii=False, indent=2)
-    except Exception as e:
+        with _CACHE_LOCK:
+            if key in _mem_cache:
+                _mem_cache.move_to_end(key)
+                return _mem_cache[key]
+            row = _CACHE_DB.execute(
+                "SELECT txt FROM tr WHERE src=? AND tgt=? AND h=?",
+                key
+            ).fetchone()
+            if row:
+                _mem_cache_set(key, row[0])
+                _touched_translations.append(key)
+        return row[0] if row else None
+    except sqlite3.Error as e:
+        print(f"Error reading translation cache: {e}")
+        return None
+
+def get_cached_translations(texts, source_lang, target_lang, hashes=None):
+    """Look up many cached translations with one query, returning {text: translation} for the hits"""
+    if hashes is None:
+        hashes = [hash_text(text) for text in texts]
+    keys = {}
+    for text_hash, text in zip(hashes, texts):
+        keys.setdefault(text_hash, text)
+    
+    found = {}
+    try:
+        with _CACHE_LOCK:
+            # Serve what we can from memory and only query SQLite for the rest
+            missing = []
+            for text_hash, text in keys.items():
+                key = (source_lang, target_lang, text_hash)
+                if key in _mem_cache:
+                    _mem_cache.move_to_end(key)
+                    found[text] = _mem_cache[key]
+                else:
+                    missing.append(text_hash)
+            
+            if missing:
+                _CACHE_DB.execute("DELETE FROM temp.q")
+                _CACHE_DB.executemany("INSERT OR IGNORE INTO temp.q(h) VALUES (?)", ((h,) for h in missing))
+                rows = _CACHE_DB.execute(
+                    "SELECT h, txt FROM tr JOIN temp.q USING (h) WHERE src=? AND tgt=?",
+                    (source_lang, target_lang)
+                ).fetchall()
+                for text_hash, translated in rows:
+                    _mem_cache_set((source_lang, target_lang, text_hash), translated)
+                    _touched_translations.append((source_lang, target_lang, text_hash))
+                    found[keys[text_hash]] = translated
+        return found
+    except sqlite3.Error as e:
+        print(f"Error reading translation cache: {e}")
+        return found
+
+def save_cached_translation(text, source_lang, target_lang, translated, text_hash=None):
+    """Store a translation in memory and queue it for SQLite, writing every CACHE_COMMIT_EVERY entries"""
+    if text_hash is None:
+        text_hash = hash_text(text)
+    try:
+        with _CACHE_LOCK:
+            _mem_cache_set((source_lang, target_lang, text_hash), translated)
+            _dirty_translations.append((source_lang, target_lang, text_hash, translated))
+            if len(_dirty_translations) >= CACHE_COMMIT_EVERY:
+                _write_dirty_translations()
+    except sqlite3.Error as e:
         print(f"Error saving translation cache: {e}")
 
-@lru_cache(maxsize=1000)
-def translate_chunk(text, source_code, target_code, translator=None):
+def flush_translation_cache():
+    """Write and commit any pending cache writes, then evict old entries if the cache is over its size"""
+    try:
+        with _CACHE_LOCK:
+            _write_dirty_translations()
+            _evict_translations()
+    except sqlite3.Error as e:
+        print(f"Error saving translation cache: {e}")
+
+def clear_translation_cache(source_lang, target_lang):
+    """Delete all cached translations for the given language pair"""
+    try:
+        with _CACHE_LOCK:
+            for key in [key for key in _mem_cache if key[:2] == (source_lang, target_lang)]:
+                del _mem_cache[key]
+            _dirty_translations[:] = [row for row in _dirty_translations if row[:2] != (source_lang, target_lang)]
+            _CACHE_DB.execute("DELETE FROM tr WHERE src=? AND tgt=?", (source_lang, target_lang))
+            _CACHE_DB.commit()
+    except sqlite3.Error as e:
+        print(f"Error clearing cache: {e}")
+
+atexit.register(flush_translation_cache)
+
+# Circuit breaker per translation backend: after BREAKER_THRESHOLD failures within
+# BREAKER_WINDOW seconds the backend is skipped, with one probe call let through
+# every BREAKER_COOLDOWN seconds until it succeeds again
+BREAKER_THRESHOLD = 3
+BREAKER_WINDOW = 30
+BREAKER_COOLDOWN = 30
+_breakers = {
+    'google': {'failures': 0, 'first_failure_at': 0.0, 'opened_at': None},
+    'mymemory': {'failures': 0, 'first_failure_at': 0.0, 'opened_at': None},
+}
+_breaker_lock = threading.Lock()
+
+def breaker_allow(backend):
+    """Return True if calls to backend are allowed (closed, or open long enough for a probe)"""
+    with _breaker_lock:
+        breaker = _breakers[backend]
+        if breaker['opened_at'] is None:
+            return True
+        if time.time() - breaker['opened_at'] >= BREAKER_COOLDOWN:
+            # Half-open: let this call probe the backend and hold off others for another cooldown
+            breaker['opened_at'] = time.time()
+            return True
+        return False
+
+def breaker_record_success(backend):
+    """Close the backend's breaker after a successful call"""
+    with _breaker_lock:
+        breaker = _breakers[backend]
+        breaker['failures'] = 0
+        breaker['opened_at'] = None
+
+def breaker_record_failure(backend):
+    """Count a failed call and open the backend's breaker once the threshold is reached"""
+    with _breaker_lock:
+        breaker = _breakers[backend]
+        now = time.time()
+        if breaker['failures'] == 0 or now - breaker['first_failure_at'] > BREAKER_WINDOW:
+            breaker['failures'] = 0
+            breaker['first_failure_at'] = now
+        breaker['failures'] += 1
+        if breaker['failures'] >= BREAKER_THRESHOLD and breaker['opened_at'] is None:
+            breaker['opened_at'] = now
+            print(f"FALLBACK_REASON={backend}_circuit_open ({breaker['failures']} failures in {BREAKER_WINDOW}s)")
+
+# Errors worth retrying: rate limiting and server-side or transport failures
+TRANSIENT_ERRORS = (TooManyRequests, ServerException, RequestError)
+# Input rejected by the client library before any request is made; not a backend failure
+VALIDATION_ERRORS = (NotValidLength, NotValidPayload)
+
+def call_with_backoff(call, retries=2, base=0.5, cap=4.0):
+    """Run call(), retrying transient errors with exponential backoff and jitter"""
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except TRANSIENT_ERRORS as e:
+            if attempt == retries:
+                raise
+            delay = min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.5)
+            print(f"Transient translation error ({e}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+def translate_chunk(text, source_code, target_code, text_hash=None):
     """Translate a chunk of text with caching for performance and multiple fallback services"""
     if not text.strip():
         return ""
     
-    # Create a hash of the text for cache lookup
-    text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
+    # Hash once for both the lookup and the write-back
+    if text_hash is None:
+        text_hash = hash_text(text)
     
-    # Try to get from memory cache first (lru_cache decorator)
-    # If not in memory, check disk cache
-    cache = load_translation_cache(source_code, target_code)
-    if text_hash in cache:
-        cached_result = cache[text_hash]
-        if cached_result and cached_result.strip():
-            return cached_result
-        # If cached result is empty, continue with translation
-    
-    # Format language codes properly
-    formatted_source = format_language_code(source_code)
-    formatted_target = format_language_code(target_code)
-    
-    print(f"Translating with codes: source={formatted_source}, target={formatted_target}")
+    # Check disk cache before going to the network
+    cached_result = get_cached_translation(text, source_code, target_code, text_hash)
+    if cached_result and cached_result.strip():
+        return cached_result
+    # If cached result is missing or empty, continue with translation
     
     # Clean the text to remove problematic characters
     cleaned_text = text.strip()
@@ -693,51 +1154,128 @@ def translate_chunk(text, source_code, target_code, translator=None):
     if len(cleaned_text) < 2:
         return cleaned_text
     
-    # Define translation services to try in order
+    try:
+        translated = _cached_translate(cleaned_text, source_code, target_code)
+    except RuntimeError as e:
+        # If all translation services failed, return original text
+        print(f"{e}, returning original text")
+        return cleaned_text
+    
+    # Save to cache
+    save_cached_translation(text, source_code, target_code, translated, text_hash)
+    return translated
+
+@lru_cache(maxsize=4096)
+def _cached_translate(text, source_code, target_code):
+    """Translate text via the fallback services, memoized in-process (failures raise and are not cached)"""
+    # Format language codes properly
+    formatted_source = format_language_code(source_code)
+    formatted_target = format_language_code(target_code)
+    
+    print(f"Translating with codes: source={formatted_source}, target={formatted_target}")
+    
+    # Define translation services to try in order, with the backend whose breaker guards each
     translation_services = [
         # 1. Google Translator with specified source
-        lambda: try_google_translation(cleaned_text, formatted_source, formatted_target),
+        ('google', partial(try_google_translation, text, formatted_source, formatted_target)),
         
         # 2. Google Translator with auto detection
-        lambda: try_google_translation(cleaned_text, 'auto', formatted_target),
+        ('google', partial(try_google_translation, text, 'auto', formatted_target)),
         
         # 3. MyMemory Translator (another service)
-        lambda: try_mymemory_translation(cleaned_text, formatted_source, formatted_target),
+        ('mymemory', partial(try_mymemory_translation, text, formatted_source, formatted_target)),
         
         # 4. MyMemory with auto detection
-        lambda: try_mymemory_translation(cleaned_text, 'auto', formatted_target),
+        ('mymemory', partial(try_mymemory_translation, text, 'auto', formatted_target)),
         
         # 5. Last resort - try with smaller chunks
-        lambda: try_chunk_translation(cleaned_text, formatted_source, formatted_target)
+        (None, partial(try_chunk_translation, text, formatted_source, formatted_target))
     ]
     
-    # Try each translation service in order
-    for service_idx, translation_service in enumerate(translation_services):
+    # Try each translation service in order, skipping backends that are currently failing
+    for service_idx, (backend, translation_service) in enumerate(translation_services):
+        if backend is not None and not breaker_allow(backend):
+            print(f"Skipping translation service {service_idx + 1}: FALLBACK_REASON={backend}_circuit_open")
+            continue
         try:
             print(f"Trying translation service {service_idx + 1}/{len(translation_services)}")
             translated = translation_service()
+            if backend is not None:
+                breaker_record_success(backend)
             
             # Verify translation actually happened
-            if translated and translated.strip() and translated != cleaned_text:
+            if translated and translated.strip() and translated != text:
                 print(f"Translation successful with service {service_idx + 1}")
-                # Save to cache
-                cache[text_hash] = translated
-                save_translation_cache(cache, source_code, target_code)
                 return translated
             else:
                 print(f"Translation service {service_idx + 1} returned empty or unchanged text")
         except Exception as e:
             print(f"Error with translation service {service_idx + 1}: {e}")
+            if backend is not None and not isinstance(e, VALIDATION_ERRORS):
+                breaker_record_failure(backend)
     
-    # If all translation services failed, return original text
-    print("All translation services failed, returning original text")
-    return cleaned_text
+    raise RuntimeError("All translation services failed")
+
+GOOGLE_TRANSLATE_URL = "https://translate.googleapis.com/translate_a/single"
+
+async def _translate_one(session, semaphore, text, source, target, timeout):
+    """Translate one text with Google's gtx endpoint, returning None on failure"""
+    async def request():
+        async with session.post(
+            GOOGLE_TRANSLATE_URL,
+            params={'client': 'gtx', 'sl': source, 'tl': target, 'dt': 't'},
+            data={'q': text}
+        ) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None, loads=json_loads)
+        # The response is [[[translated, original, ...], ...], ...], one entry per sentence
+        return "".join(segment[0] for segment in data[0] if segment and segment[0])
+    
+    async with semaphore:
+        try:
+            return await asyncio.wait_for(request(), timeout)
+        except Exception as e:
+            print(f"Async Google translation error: {e}")
+            return None
+
+async def _translate_many(texts, source, target, concurrency, timeout):
+    """Translate texts concurrently over one keep-alive session"""
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(
+            *(_translate_one(session, semaphore, text, source, target, timeout) for text in texts)
+        )
+
+def translate_many(texts, source, target, concurrency=8, timeout=15):
+    """Translate texts concurrently with aiohttp; failed items come back as None (all None without aiohttp)"""
+    if aiohttp is None or not texts:
+        return [None] * len(texts)
+    try:
+        return asyncio.run(_translate_many(texts, source, target, concurrency, timeout))
+    except Exception as e:
+        print(f"Async translation failed: {e}")
+        return [None] * len(texts)
+
+# Translator instances keep per-request state (URL params), so each thread gets its own
+_tls = threading.local()
+
+def _get_translator(cls, source, target):
+    """Return this thread's cached cls(source=source, target=target) instance"""
+    translators = getattr(_tls, 'translators', None)
+    if translators is None:
+        translators = _tls.translators = {}
+    key = (cls, source, target)
+    translator = translators.get(key)
+    if translator is None:
+        translator = translators[key] = cls(source=source, target=target)
+    return translator
 
 def try_google_translation(text, source, target):
     """Try to translate using Google Translator"""
     try:
-        translator = GoogleTranslator(source=source, target=target)
-        result = translator.translate(text)
+        translator = _get_translator(GoogleTranslator, source, target)
+        result = call_with_backoff(lambda: translator.translate(text))
         return result
     except Exception as e:
         print(f"Google translation error: {e}")
@@ -746,47 +1284,96 @@ def try_google_translation(text, source, target):
 def try_mymemory_translation(text, source, target):
     """Try to translate using MyMemory Translator"""
     try:
-        # MyMemory has a limit of 5000 characters per request
-        if len(text) > 4900:  # Leave some margin
-            # Split into smaller chunks
-            chunks = []
-            for i in range(0, len(text), 4000):
-                chunks.append(text[i:i+4000])
+        # MyMemory rejects requests over 500 characters
+        if len(text) > MYMEMORY_CHAR_LIMIT:
+            # Split into smaller chunks at paragraph, sentence or word boundaries
+            chunks = hierarchical_chunks(text, max_chars=MYMEMORY_CHAR_LIMIT)
             
             results = []
             for chunk in chunks:
-                translator = MyMemoryTranslator(source=source, target=target)
-                results.append(translator.translate(chunk))
+                translator = _get_translator(MyMemoryTranslator, source, target)
+                results.append(call_with_backoff(lambda: translator.translate(chunk)))
             
             return " ".join(results)
         else:
-            translator = MyMemoryTranslator(source=source, target=target)
-            return translator.translate(text)
+            translator = _get_translator(MyMemoryTranslator, source, target)
+            return call_with_backoff(lambda: translator.translate(text))
     except Exception as e:
         print(f"MyMemory translation error: {e}")
         raise
 
+# Whitespace following sentence-ending punctuation
+_SENT_RE = re.compile(r'(?<=[.!?])\s+')
+
+def iter_sentences(text):
+    """Yield the non-empty sentences of text without building an intermediate split list"""
+    prev = 0
+    for match in _SENT_RE.finditer(text):
+        if text[prev:match.start()].strip():
+            yield text[prev:match.start()]
+        prev = match.end()
+    if text[prev:].strip():
+        yield text[prev:]
+
+def _merge_pieces(pieces, max_chars):
+    """Greedily join consecutive pieces with spaces into chunks of at most max_chars"""
+    merged = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 1 + len(piece) > max_chars:
+            merged.append(current)
+            current = piece
+        else:
+            current = f"{current} {piece}" if current else piece
+    if current:
+        merged.append(current)
+    return merged
+
+def hierarchical_chunks(text, max_chars=1000):
+    """Split text into chunks of at most max_chars, breaking at paragraphs, then sentences, then words"""
+    chunks = []
+    for paragraph in text.split('\n\n'):
+        if not paragraph.strip():
+            continue
+        if len(paragraph) <= max_chars:
+            chunks.append(paragraph)
+            continue
+        
+        # Long paragraph: split into sentences, and sentences that are still too long into words
+        pieces = []
+        for sentence in iter_sentences(paragraph):
+            if len(sentence) <= max_chars:
+                pieces.append(sentence)
+                continue
+            for word in sentence.split():
+                # Only a single word longer than max_chars is cut
+                pieces.extend(word[i:i + max_chars] for i in range(0, len(word), max_chars))
+        chunks.extend(_merge_pieces(pieces, max_chars))
+    return chunks
+
 def try_chunk_translation(text, source, target):
     """Try to translate by breaking text into smaller chunks"""
     try:
-        # Break text into sentences
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        # Break text into sentences and send them concurrently when aiohttp is available
+        sentences = list(iter_sentences(text))
+        fast_results = translate_many(sentences, source, target)
         
         results = []
-        for sentence in sentences:
-            if not sentence.strip():
+        for sentence, fast_result in zip(sentences, fast_results):
+            if fast_result and fast_result.strip() and fast_result != sentence:
+                results.append(fast_result)
                 continue
                 
             try:
                 # Try Google first
-                translator = GoogleTranslator(source=source, target=target)
+                translator = _get_translator(GoogleTranslator, source, target)
                 result = translator.translate(sentence)
                 
                 if result and result != sentence:
                     results.append(result)
                 else:
                     # If Google fails, try MyMemory
-                    translator = MyMemoryTranslator(source=source, target=target)
+                    translator = _get_translator(MyMemoryTranslator, source, target)
                     result = translator.translate(sentence)
                     results.append(result)
             except:
@@ -798,50 +1385,69 @@ def try_chunk_translation(text, source, target):
         print(f"Chunk translation error: {e}")
         raise
 
-def translate_chunks_parallel(chunks, source_code, target_code, max_workers=2):
+# One worker pool for the whole process, shared by all chunk translation, so document-wide
+# request concurrency is bounded by PDFTR_WORKERS instead of several independent pools
+_TRANSLATION_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=int(os.environ.get('PDFTR_WORKERS', 4)),
+    thread_name_prefix='xl'
+)
+atexit.register(_TRANSLATION_EXECUTOR.shutdown)
+
+def translate_chunks_parallel(chunks, source_code, target_code, hashes=None):
     """Translate chunks in parallel for better performance and reliability"""
+    # Callers that already hashed the chunks for a cache lookup pass the hashes along; otherwise
+    # hash each chunk here once, so saving an async result and the per-chunk fallback share it
+    if hashes is None:
+        hashes = [hash_text(chunk) for chunk in chunks]
+    
     # Format language codes properly
     formatted_source = format_language_code(source_code)
     formatted_target = format_language_code(target_code)
     
-    # Don't share translator instances between threads to avoid concurrency issues
-    # Each thread will create its own translator instance
-    
     results = []
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all translation tasks
-        future_to_chunk = {
-            executor.submit(translate_chunk, chunk, formatted_source, formatted_target, None): 
-            i for i, chunk in enumerate(chunks)
-        }
-        
-        # Process results as they complete
-        for future in concurrent.futures.as_completed(future_to_chunk):
-            chunk_idx = future_to_chunk[future]
+    # Try all chunks at once over a shared keep-alive session first (no-op without aiohttp)
+    remaining = []
+    for i, translated in enumerate(translate_many(chunks, formatted_source, formatted_target)):
+        if translated and translated.strip() and translated != chunks[i].strip():
+            save_cached_translation(chunks[i], formatted_source, formatted_target, translated, hashes[i])
+            results.append((i, translated))
+        else:
+            remaining.append(i)
+    
+    executor = _TRANSLATION_EXECUTOR
+    # Submit the remaining translation tasks
+    future_to_chunk = {
+        executor.submit(translate_chunk, chunks[i], formatted_source, formatted_target, hashes[i]): 
+        i for i in remaining
+    }
+    
+    # Process results as they complete
+    for future in concurrent.futures.as_completed(future_to_chunk):
+        chunk_idx = future_to_chunk[future]
+        try:
+            result = future.result()
+            if result and result.strip():
+                results.append((chunk_idx, result))
+                print(f"Completed chunk {chunk_idx+1}/{len(chunks)}")
+            else:
+                print(f"Warning: Empty result for chunk {chunk_idx+1}, using original")
+                results.append((chunk_idx, chunks[chunk_idx]))
+        except Exception as e:
+            print(f"Error translating chunk {chunk_idx+1}: {e}")
+            # Try one more time with a different approach
             try:
-                result = future.result()
+                print(f"Retrying chunk {chunk_idx+1} with auto detection")
+                # Try with auto detection
+                result = translate_chunk(chunks[chunk_idx], 'auto', formatted_target, hashes[chunk_idx])
                 if result and result.strip():
                     results.append((chunk_idx, result))
-                    print(f"Completed chunk {chunk_idx+1}/{len(chunks)}")
+                    print(f"Retry successful for chunk {chunk_idx+1}")
                 else:
-                    print(f"Warning: Empty result for chunk {chunk_idx+1}, using original")
                     results.append((chunk_idx, chunks[chunk_idx]))
-            except Exception as e:
-                print(f"Error translating chunk {chunk_idx+1}: {e}")
-                # Try one more time with a different approach
-                try:
-                    print(f"Retrying chunk {chunk_idx+1} with auto detection")
-                    # Try with auto detection
-                    result = translate_chunk(chunks[chunk_idx], 'auto', formatted_target, None)
-                    if result and result.strip():
-                        results.append((chunk_idx, result))
-                        print(f"Retry successful for chunk {chunk_idx+1}")
-                    else:
-                        results.append((chunk_idx, chunks[chunk_idx]))
-                except Exception as retry_error:
-                    print(f"Retry also failed for chunk {chunk_idx+1}: {retry_error}")
-                    results.append((chunk_idx, chunks[chunk_idx]))  # Use original text on error
+            except Exception as retry_error:
+                print(f"Retry also failed for chunk {chunk_idx+1}: {retry_error}")
+                results.append((chunk_idx, chunks[chunk_idx]))  # Use original text on error
     
     # Sort results by original chunk index
     results.sort(key=lambda x: x[0])
@@ -860,12 +1466,166 @@ def translate_chunks_parallel(chunks, source_code, target_code, max_workers=2):
     
     return [result for _, result in results]
 
-def translate_text(input_path, output_path, source_lang, target_lang):
+# Record separator symbol; translators pass it through untouched
+BATCH_SENTINEL = "\n\u241E\n"
+BATCH_CHAR_LIMIT = 4000
+MYMEMORY_CHAR_LIMIT = 500
+# Cap texts per packed request so one mangled separator doesn't send many texts to the fallback
+BATCH_MAX_ITEMS = 50
+
+def _split_batch(translated, expected):
+    """Split a translated packed request back into its parts, or None if the separators didn't survive"""
+    if not translated:
+        return None
+    parts = [part.strip() for part in translated.split(BATCH_SENTINEL.strip())]
+    return parts if len(parts) == expected else None
+
+def byte_batches(items, max_chars, max_items):
+    """Greedily group items into lists of at most max_items items and max_chars total characters"""
+    batch = []
+    batch_chars = 0
+    for item in items:
+        if batch and (batch_chars + len(item) > max_chars or len(batch) >= max_items):
+            yield batch
+            batch = []
+            batch_chars = 0
+        batch.append(item)
+        batch_chars += len(item)
+    if batch:
+        yield batch
+
+def pack_texts(texts, max_chars=BATCH_CHAR_LIMIT, sep=BATCH_SENTINEL, max_items=BATCH_MAX_ITEMS):
+    """Split texts into groups of consecutive indices whose joined length (with sep) fits in max_chars"""
+    groups = []
+    current = []
+    current_len = 0
+    for i, text in enumerate(texts):
+        # The separator is only paid between texts, not before the first one
+        added_len = len(text) + (len(sep) if current else 0)
+        if current and (current_len + added_len > max_chars or len(current) >= max_items):
+            groups.append(current)
+            current = []
+            current_len = 0
+            added_len = len(text)
+        current.append(i)
+        current_len += added_len
+    if current:
+        groups.append(current)
+    return groups
+
+def translate_packed_mymemory(texts, source, target):
+    """Translate texts with MyMemory, packing them into requests under its 500-character limit"""
+    parts = []
+    for group in pack_texts(texts, max_chars=MYMEMORY_CHAR_LIMIT):
+        # A text too long to pack with others is split on its own
+        if len(group) == 1:
+            parts.append(try_mymemory_translation(texts[group[0]], source, target))
+            continue
+        joined = BATCH_SENTINEL.join(texts[i] for i in group)
+        translator = _get_translator(MyMemoryTranslator, source, target)
+        group_parts = _split_batch(translator.translate(joined), len(group))
+        if group_parts is None:
+            return None
+        parts.extend(group_parts)
+    return parts
+
+def translate_batch(texts, source_code, target_code):
+    """Translate a list of texts with one request per ~4000 characters, using the cache for repeats"""
+    results = [None] * len(texts)
+    
+    # Hash each text once for both the lookup and the write-back
+    hashes = [hash_text(text) for text in texts]
+    
+    # Only send cache misses to the translator
+    cached = get_cached_translations(texts, source_code, target_code, hashes)
+    pending = []
+    for i, text in enumerate(texts):
+        cached_result = cached.get(text)
+        if cached_result and cached_result.strip():
+            results[i] = cached_result
+        elif not text.strip():
+            results[i] = ""
+        else:
+            pending.append(i)
+    
+    print(f"Batch translation: {len(texts) - len(pending)} cached, {len(pending)} to translate")
+    
+    # Group pending texts so each joined request stays under the size limit
+    groups = [[pending[j] for j in group] for group in pack_texts([texts[i] for i in pending])]
+    
+    formatted_source = format_language_code(source_code)
+    formatted_target = format_language_code(target_code)
+    
+    # Join each group into one request (single texts go through the normal service chain)
+    joined = {}
+    for group_idx, group in enumerate(groups):
+        group_texts = [texts[i] for i in group]
+        if len(group) > 1 and not any(BATCH_SENTINEL.strip() in text for text in group_texts):
+            joined[group_idx] = BATCH_SENTINEL.join(group_texts)
+    
+    # Send all joined requests concurrently when aiohttp is available
+    responses = {}
+    if aiohttp is not None and joined:
+        responses = dict(zip(joined, translate_many(list(joined.values()), formatted_source, formatted_target)))
+    
+    for group_idx, group in enumerate(groups):
+        group_texts = [texts[i] for i in group]
+        translated_parts = None
+        
+        if group_idx in joined:
+            if group_idx in responses:
+                translated = responses[group_idx]
+            elif breaker_allow('google'):
+                try:
+                    translated = try_google_translation(joined[group_idx], formatted_source, formatted_target)
+                    breaker_record_success('google')
+                except Exception as e:
+                    print(f"Batch {group_idx + 1} translation failed: {e}")
+                    breaker_record_failure('google')
+                    translated = None
+            else:
+                print(f"Batch {group_idx + 1}: FALLBACK_REASON=google_circuit_open")
+                translated = None
+            translated_parts = _split_batch(translated, len(group))
+            
+            if translated_parts is None and breaker_allow('mymemory'):
+                print(f"Batch {group_idx + 1}: Google result unusable, trying MyMemory")
+                try:
+                    translated_parts = translate_packed_mymemory(group_texts, formatted_source, formatted_target)
+                    breaker_record_success('mymemory')
+                except Exception as e:
+                    print(f"Batch {group_idx + 1} MyMemory translation failed: {e}")
+                    if not isinstance(e, VALIDATION_ERRORS):
+                        breaker_record_failure('mymemory')
+            
+            if translated_parts is None:
+                print(f"Batch {group_idx + 1}: translators dropped or mangled the separators, translating individually")
+        
+        if translated_parts is None:
+            # Fall back to per-chunk translation with the full service chain
+            translated_parts = translate_chunks_parallel(group_texts, source_code, target_code, [hashes[i] for i in group])
+        else:
+            for i, part in zip(group, translated_parts):
+                if part:
+                    save_cached_translation(texts[i], source_code, target_code, part, hashes[i])
+        
+        for i, part in zip(group, translated_parts):
+            results[i] = part if part and part.strip() else texts[i]
+        
+        print(f"Completed batch {group_idx + 1}/{len(groups)} ({len(group)} chunks, {sum(len(t) for t in group_texts)} chars)")
+    
+    return results
+
+def translate_text(input_path, output_path, source_lang, target_lang, refresh_cache=False):
     """Translate text from source language to target language with optimizations"""
     start_time = time.time()
     try:
-        with open(input_path, 'r', encoding='utf-8', errors='ignore') as file:
-            text = file.read()
+        # Handle special case when source and target are the same before doing any other work
+        if source_lang == target_lang and source_lang != 'auto':
+            print("Source and target languages are the same, skipping translation")
+            import shutil
+            shutil.copyfile(input_path, output_path)
+            return True
         
         # Format language codes properly
         source_code = format_language_code(source_lang)
@@ -873,21 +1633,20 @@ def translate_text(input_path, output_path, source_lang, target_lang):
         
         print(f"Translating from {source_lang} ({source_code}) to {target_lang} ({target_code})")
         
-        # Handle special case when source and target are the same
+        # Different spellings of the same language (e.g. 'english' and 'en')
         if source_code == target_code and source_code != 'auto':
             print("Source and target languages are the same, skipping translation")
-            with open(output_path, 'w', encoding='utf-8') as file:
-                file.write(text)
+            import shutil
+            shutil.copyfile(input_path, output_path)
             return True
         
-        # Clear any existing cache for this language pair to ensure fresh translations
-        try:
-            cache_path = get_cache_path(source_code, target_code)
-            if os.path.exists(cache_path):
-                print(f"Removing existing translation cache for {source_code}->{target_code}")
-                os.remove(cache_path)
-        except Exception as e:
-            print(f"Error clearing cache: {e}")
+        with open(input_path, 'r', encoding='utf-8', errors='ignore') as file:
+            text = file.read()
+        
+        # Only drop cached translations for this language pair when asked to
+        if refresh_cache:
+            print(f"Removing existing translation cache for {source_code}->{target_code}")
+            clear_translation_cache(source_code, target_code)
         
         # Process the full document for better results
         total_length = len(text)
@@ -912,56 +1671,38 @@ def translate_text(input_path, output_path, source_lang, target_lang):
             sample_text = beginning + "\n\n[...]\n\n" + middle + "\n\n[...]\n\n" + end_portion
             print(f"Reduced text from {total_length} to {len(sample_text)} characters for translation")
         
-        # Split text into smaller chunks for more reliable translation
+        # Split text into smaller chunks for more reliable translation, at paragraph,
+        # sentence or word boundaries rather than mid-sentence
         MAX_CHUNK_SIZE = 1000  # Smaller chunks for better reliability
-        
-        # Split text into paragraphs first
-        paragraphs = sample_text.split('\n\n')
-        
-        # Then split paragraphs into chunks if needed
-        chunks = []
-        for paragraph in paragraphs:
-            if len(paragraph) <= MAX_CHUNK_SIZE:
-                if paragraph.strip():
-                    chunks.append(paragraph)
-            else:
-                # Split long paragraphs
-                for i in range(0, len(paragraph), MAX_CHUNK_SIZE):
-                    chunk = paragraph[i:i + MAX_CHUNK_SIZE]
-                    if chunk.strip():
-                        chunks.append(chunk)
+        chunks = hierarchical_chunks(sample_text, max_chars=MAX_CHUNK_SIZE)
         
         print(f"Split text into {len(chunks)} chunks for translation")
         
-        # Determine optimal number of workers based on chunk count
-        max_workers = min(2, len(chunks))  # Use fewer workers for reliability
-        
-        # Translate chunks in parallel
-        print(f"Starting parallel translation with {max_workers} workers")
-        translated_chunks = []
+        # Translate chunks in batches; each batch is sent as a few joined requests
+        print("Starting batched translation")
+        translated_count = 0
         
-        # Process in smaller batches for better reliability
-        batch_size = 10
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i + batch_size]
-            print(f"Translating batch {i//batch_size + 1}/{(len(chunks) + batch_size - 1)//batch_size}")
-            
-            batch_results = translate_chunks_parallel(batch, source_code, target_code, max_workers)
-            translated_chunks.extend(batch_results)
-            
-            # Save intermediate results
-            intermediate_text = '\n\n'.join(translated_chunks)
-            with open(output_path, 'w', encoding='utf-8') as file:
-                file.write(intermediate_text)
-            
-            print(f"Saved intermediate results ({len(translated_chunks)}/{len(chunks)} chunks)")
-        
-        # Combine translated chunks with proper paragraph separation
-        translated_text = '\n\n'.join(translated_chunks)
-        
-        # Write final translated text to output file
+        # Batch by total size (about one round of concurrent requests each) rather than by count,
+        # appending each batch to the output file as it completes so intermediate results are kept
+        # without rewriting everything translated so far
+        batch_chars = BATCH_CHAR_LIMIT * 8
         with open(output_path, 'w', encoding='utf-8') as file:
-            file.write(translated_text)
+            for batch_idx, batch in enumerate(byte_batches(chunks, max_chars=batch_chars, max_items=BATCH_MAX_ITEMS * 8)):
+                print(f"Translating batch {batch_idx + 1} ({len(batch)} chunks, {sum(len(chunk) for chunk in batch)} chars)")
+                
+                batch_results = translate_batch(batch, source_code, target_code)
+                
+                # Chunks are separated by blank lines, with none after the last one
+                if translated_count:
+                    file.write('\n\n')
+                file.write('\n\n'.join(batch_results))
+                file.flush()
+                translated_count += len(batch_results)
+                
+                print(f"Saved intermediate results ({translated_count}/{len(chunks)} chunks)")
+        
+        # Persist this document's new translations
+        flush_translation_cache()
         
         elapsed_time = time.time() - start_time
         print(f"Translation completed successfully in {elapsed_time:.2f} seconds")
@@ -971,16 +1712,10 @@ def translate_text(input_path, output_path, source_lang, target_lang):
         import traceback
         traceback.print_exc()
         
-        # Try to save whatever we've translated so far
-        try:
-            if 'translated_chunks' in locals() and translated_chunks:
-                partial_text = '\n\n'.join(translated_chunks)
-                with open(output_path, 'w', encoding='utf-8') as file:
-                    file.write(partial_text)
-                print(f"Saved partial translation with {len(translated_chunks)} chunks")
-                return True
-        except Exception as save_error:
-            print(f"Error saving partial translation: {save_error}")
+        # Whatever was translated so far has already been written to the output file
+        if 'translated_count' in locals() and translated_count:
+            print(f"Saved partial translation with {translated_count} chunks")
+            return True
         
         return False
 
@@ -1149,7 +1884,494 @@ def get_language_name(lang_code):
     }
     return language_names.get(lang_code, lang_code.capitalize())
 
-def translate_pdf_with_images(input_pdf_path, output_pdf_path, source_lang, target_lang):
+def sample_background_color(pix, samples, rect):
+    """Average RGB color (0-1) of the four pixels just outside the corners of an (x0, y0, x1, y1) rect"""
+    x0, y0, x1, y1 = rect
+    xs = [int(x0) - 5, int(x1) + 5, int(x0) - 5, int(x1) + 5]
+    ys = [int(y0) - 5, int(y0) - 5, int(y1) + 5, int(y1) + 5]
+    if samples is not None:
+        # One gather over the pixmap's samples viewed as a (height, width, n) array
+        xs = np.clip(xs, 0, pix.width - 1)
+        ys = np.clip(ys, 0, pix.height - 1)
+        return tuple(float(c) for c in samples[ys, xs, :3].mean(axis=0) / 255)
+    
+    pixels = [
+        pix.pixel(min(max(x, 0), pix.width - 1), min(max(y, 0), pix.height - 1))
+        for x, y in zip(xs, ys)
+    ]
+    return tuple(sum(pixel[i] for pixel in pixels) / (255 * len(pixels)) for i in range(3))
+
+def has_translated_blocks(page_blocks, translation_mapping):
+    """Whether _render_page would draw any translated text for these blocks"""
+    for block in page_blocks:
+        text = block[4]
+        if not text or len(text.strip()) < 2:
+            continue
+        translated = translation_mapping.get(text, text)
+        if translated.strip() and translated.strip() != text.strip():
+            return True
+    return False
+
+def page_runs(page_indices):
+    """Group sorted page indices into (first, last) runs of consecutive pages"""
+    runs = []
+    for page_idx in page_indices:
+        if runs and runs[-1][1] == page_idx - 1:
+            runs[-1][1] = page_idx
+        else:
+            runs.append([page_idx, page_idx])
+    return [tuple(run) for run in runs]
+
+# Room to grow each block's text box by when inserting its translation
+TEXTBOX_EXTRA_WIDTH = 20
+TEXTBOX_EXTRA_HEIGHT = 10
+# Area one point of 11pt text width takes up once wrapped, including line spacing and ragged line ends
+TEXTBOX_AREA_PER_POINT = 20
+
+def block_font_sizes(page_blocks, translation_mapping, fontname="Helvetica"):
+    """Font size of each block, between 6pt and 11pt, at which its translation fills its text box"""
+    # Width of each translation set on a single line at 11pt; the wrapped text needs about
+    # that width times the line height in area, and the area scales with the font size squared
+    text_widths = [
+        fitz.get_text_length(translation_mapping.get(block[4], block[4]).strip(), fontname=fontname, fontsize=11)
+        for block in page_blocks
+    ]
+    box_areas = [
+        (block[2] - block[0] + TEXTBOX_EXTRA_WIDTH) * (block[3] - block[1] + TEXTBOX_EXTRA_HEIGHT)
+        for block in page_blocks
+    ]
+    if np is not None:
+        scales = np.array(box_areas, dtype=float) / (np.maximum(1, text_widths) * TEXTBOX_AREA_PER_POINT)
+        return np.clip(11 * np.sqrt(np.maximum(scales, 0)), 6, 11).tolist()
+    return [
+        max(6, min(11, 11 * math.sqrt(max(area, 0) / (max(1, width) * TEXTBOX_AREA_PER_POINT))))
+        for area, width in zip(box_areas, text_widths)
+    ]
+
+def _render_page(pdf_document, new_page, page_idx, translation_mapping, page_blocks):
+    """Render the translated text blocks of one page onto an output page of the same size"""
+    page = pdf_document[page_idx]
+    print(f"Processing page {page_idx+1}/{len(pdf_document)}")
+    
+    # First, copy the entire page as background (preserves all images and layout)
+    new_page.show_pdf_page(
+        new_page.rect,
+        pdf_document,
+        page_idx,
+        clip=None,
+        keep_proportion=True,
+        overlay=False,
+        oc=0,
+        rotate=0
+    )
+    
+    # If no blocks were found, try to extract text directly from the page
+    if len(page_blocks) == 0:
+        print(f"No text blocks found on page {page_idx+1}, trying direct text extraction")
+        try:
+            # Get all text from the page
+            page_text = page.get_text()
+            if page_text and len(page_text.strip()) > 10:
+                # Create a single block covering the whole page
+                page_blocks = [[
+                    10,  # x0 - leave margin
+                    10,  # y0 - leave margin
+                    page.rect.width - 10,  # x1
+                    page.rect.height - 10,  # y1
+                    page_text,
+                    0,  # block number
+                    0   # block type (text)
+                ]]
+                print(f"Created a single block with {len(page_text)} characters")
+        except Exception as e:
+            print(f"Error extracting text directly from page {page_idx+1}: {e}")
+    
+    # Page pixmap for background color sampling, rendered once on the first block that needs it
+    pix = None
+    samples = None
+    
+    # Font sizes for all blocks of the page in one pass
+    font_sizes = block_font_sizes(page_blocks, translation_mapping)
+    
+    # Process each text block
+    for block_idx, block in enumerate(page_blocks):
+        # Process text block
+        # Plain tuples are accepted by draw_rect and insert_textbox, no need for fitz.Rect objects
+        x0, y0, x1, y1 = block[:4]
+        rect = (x0, y0, x1, y1)
+        text = block[4]
+        
+        try:
+            # Skip very short or empty blocks
+            if not text or len(text.strip()) < 2:
+                continue
+                
+            # Get translation for this text
+            translated = translation_mapping.get(text, text)
+            
+            # Skip if translation is empty or identical to original (translations come back stripped)
+            if not translated.strip() or translated.strip() == text.strip():
+                continue
+            
+            # Create a white rectangle to cover the original text
+            # Use a slightly transparent white to blend better with background
+            # Try to detect the background color for better blending
+            try:
+                # Sample the background color near the text block
+                if pix is None:
+                    # Rendered at 1x, so one pixel is one point and the sample points (page
+                    # coordinates) index the pixmap directly
+                    pix = page.get_pixmap()
+                    if np is not None:
+                        samples = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+                bg_color = sample_background_color(pix, samples, rect)
+                
+                # Draw rectangle with detected background color
+                # PyMuPDF version compatibility - older versions don't support opacity
+                new_page.draw_rect(rect, color=bg_color, fill=bg_color)
+            except Exception as color_error:
+                print(f"Error detecting background color: {color_error}, using white")
+                # Fallback to white background
+                new_page.draw_rect(rect, color=(1, 1, 1), fill=(1, 1, 1))
+            
+            # Font size measured to fit the translation in the text box
+            fontsize = font_sizes[block_idx]
+            
+            # Determine text color - use black for light backgrounds, white for dark backgrounds
+            text_color = (0, 0, 0)  # Default to black
+            try:
+                # Calculate background brightness (simple average)
+                if 'bg_color' in locals():
+                    brightness = sum(bg_color) / 3
+                    # Use white text on dark backgrounds
+                    if brightness < 0.5:
+                        text_color = (1, 1, 1)
+            except:
+                pass
+            
+            # Insert the translated text with word wrapping
+            # Expand the rectangle slightly to accommodate longer translations
+            expanded_rect = (
+                x0,
+                y0,
+                x1 + TEXTBOX_EXTRA_WIDTH,  # Add extra width
+                y1 + TEXTBOX_EXTRA_HEIGHT  # Add extra height
+            )
+            
+            # Insert at the measured size; the estimate can fall short when wrapping leaves
+            # long gaps at line ends, so retry once at the 6pt minimum before giving up
+            success = False
+            for size in (fontsize, 6) if fontsize > 6 else (6,):
+                try:
+                    text_inserted = new_page.insert_textbox(
+                        expanded_rect,
+                        translated,
+                        fontsize=size,
+                        fontname="Helvetica",
+                        color=text_color,
+                        align=0
+                    )
+                except Exception as font_error:
+                    print(f"Font error at {size:.1f}pt: {font_error}")
+                    break
+                if text_inserted >= 0:
+                    success = True
+                    break
+            
+            # If all attempts failed, try a simpler approach with text insertion
+            if not success:
+                try:
+                    # Try with the simplest text insertion method
+                    try:
+                        # Try insert_text instead of insert_textbox
+                        new_page.insert_text(
+                            point=(x0, y0 + 10),
+                            text=translated[:100] + ("..." if len(translated) > 100 else ""),
+                            fontsize=6,
+                            color=text_color
+                        )
+                        success = True
+                    except Exception as text_error:
+                        print(f"Simple text insertion failed: {text_error}")
+                        
+                        # Last resort: try to draw text directly
+                        try:
+                            # Create a simple text annotation
+                            annot = new_page.add_text_annot(
+                                (x0, y0),  # top-left point
+                                translated[:50] + ("..." if len(translated) > 50 else ""),
+                                icon="Note"
+                            )
+                            success = True
+                        except Exception as annot_error:
+                            print(f"Text annotation failed: {annot_error}")
+                except Exception as last_error:
+                    print(f"All text insertion methods failed: {last_error}")
+        except Exception as e:
+            print(f"Error processing block {block_idx} on page {page_idx+1}: {e}")
+            import traceback
+            traceback.print_exc()
+    
+    print(f"Finished processing page {page_idx+1}")
+
+
+# Document opened by each render worker process
+_render_document = None
+
+def _render_page_pdf(pdf_path, page_idx, translation_mapping, page_blocks):
+    """Render one translated page in a worker process, returning (page_idx, single-page PDF bytes)"""
+    global _render_document
+    if _render_document is None or _render_document.name != pdf_path:
+        _render_document = fitz.open(pdf_path)
+    page = _render_document[page_idx]
+    
+    output_document = fitz.open()
+    new_page = output_document.new_page(width=page.rect.width, height=page.rect.height)
+    _render_page(_render_document, new_page, page_idx, translation_mapping, page_blocks)
+    page_pdf = output_document.tobytes()
+    output_document.close()
+    return page_idx, page_pdf
+
+def _collect_rendered_pages(pdf_document, output_document, future_to_page, wait=False):
+    """Swap finished pages from the render pool into their placeholders (waiting for all of them if wait);
+    a page whose render failed is copied untranslated from pdf_document instead"""
+    if wait:
+        concurrent.futures.wait(future_to_page)
+    for future in [future for future in future_to_page if future.done()]:
+        page_idx = future_to_page.pop(future)
+        output_document.delete_page(page_idx)
+        try:
+            _, page_pdf = future.result()
+            with fitz.open("pdf", page_pdf) as rendered:
+                output_document.insert_pdf(rendered, start_at=page_idx)
+        except Exception as e:
+            print(f"Error rendering page {page_idx+1}: {e}, keeping the original page")
+            output_document.insert_pdf(pdf_document, from_page=page_idx, to_page=page_idx, start_at=page_idx)
+
+# Pages waiting for translation, new text per translation round, and pages submitted per
+# render worker (rendering or rendered but not yet inserted) in the streaming pipeline
+PAGE_QUEUE_SIZE = 16
+PAGE_BATCH_CHARS = BATCH_CHAR_LIMIT * 8
+RENDERS_PER_WORKER = 2
+
+# Blocks with nothing to translate (page numbers, "1.2.3", equation fragments, URLs)
+_NON_TRANSLATABLE = re.compile(r'^[\s\d\W]+$')
+_URL_RE = re.compile(r'^https?://\S+$')
+MIN_ALPHA_RATIO = 0.3
+
+def is_translatable(text):
+    """Whether a text block has enough letters to be worth sending to a translator"""
+    stripped = text.strip()
+    if not stripped or _NON_TRANSLATABLE.match(stripped) or _URL_RE.match(stripped):
+        return False
+    return sum(c.isalpha() for c in stripped) / len(stripped) >= MIN_ALPHA_RATIO
+
+def _word_blocks(paragraphs):
+    """Turn lines of words grouped into paragraphs into [x0, y0, x1, y1, text, para_idx, 0] blocks"""
+    blocks = []
+    for para_idx, para in enumerate(paragraphs):
+        # Calculate bounding box
+        x0 = min(w[0] for line in para for w in line)
+        y0 = min(w[1] for line in para for w in line)
+        x1 = max(w[2] for line in para for w in line)
+        y1 = max(w[3] for line in para for w in line)
+        
+        # Combine text
+        text = "".join(" ".join(w[4] for w in line) + "\n" for line in para)
+        
+        if text.strip() and len(text.strip()) >= 2:
+            blocks.append([x0, y0, x1, y1, text, para_idx, 0])
+    return blocks
+
+def group_words_into_blocks(words):
+    """Group (x0, y0, x1, y1, text, ...) words into lines (within 12pt of the line's first word)
+    and lines into paragraphs (split on vertical gaps over 20pt), returning text blocks"""
+    if not words:
+        return []
+    
+    if np is None:
+        # Sort words by y-coordinate (top to bottom)
+        words = sorted(words, key=lambda w: (w[3], w[0]))  # Sort by y1, then x0
+        
+        current_line_y = words[0][3]
+        line_words = []
+        lines = []
+        
+        # Group words into lines based on y-coordinate
+        for word in words:
+            if abs(word[3] - current_line_y) < 12:  # If on same line (within 12 points)
+                line_words.append(word)
+            else:
+                # New line
+                if line_words:
+                    lines.append(line_words)
+                line_words = [word]
+                current_line_y = word[3]
+        
+        # Add the last line
+        if line_words:
+            lines.append(line_words)
+        
+        # Group lines into paragraphs
+        paragraphs = []
+        current_para = []
+        
+        for line in lines:
+            if current_para and (line[0][3] - current_para[-1][-1][3]) > 20:
+                # If vertical gap is large, start a new paragraph
+                paragraphs.append(current_para)
+                current_para = [line]
+            else:
+                current_para.append(line)
+        
+        # Add the last paragraph
+        if current_para:
+            paragraphs.append(current_para)
+        
+        return _word_blocks(paragraphs)
+    
+    # Same grouping on arrays: a stable sort by (y1, x0), then line starts found with
+    # searchsorted (one step per line rather than per word) and paragraph breaks with one diff
+    coords = np.array([w[:4] for w in words], dtype=np.float64)
+    order = np.lexsort((coords[:, 0], coords[:, 3]))
+    ys = coords[order, 3]
+    
+    line_starts = [0]
+    while True:
+        next_start = int(np.searchsorted(ys, ys[line_starts[-1]] + 12, side='left'))
+        if next_start >= len(ys):
+            break
+        line_starts.append(next_start)
+    line_starts = np.array(line_starts)
+    line_ends = np.append(line_starts[1:], len(ys))
+    
+    # Gap between a line's first word and the previous line's last word
+    gaps = ys[line_starts[1:]] - ys[line_ends[:-1] - 1]
+    para_breaks = np.flatnonzero(gaps > 20) + 1
+    
+    sorted_words = [words[i] for i in order]
+    lines = [sorted_words[start:end] for start, end in zip(line_starts, line_ends)]
+    paragraphs = [lines[start:end] for start, end in zip(np.append(0, para_breaks), np.append(para_breaks, len(lines)))]
+    return _word_blocks(paragraphs)
+
+def rawdict_views(raw):
+    """Derive the "blocks" and "words" views of page.get_text() from a single rawdict extraction"""
+    text_blocks = []
+    words = []
+    
+    for block_no, block in enumerate(raw.get("blocks", [])):
+        x0, y0, x1, y1 = block["bbox"]
+        if block.get("type") != 0:  # image block
+            text_blocks.append((x0, y0, x1, y1, f"<image: {block.get('ext')}>", block_no, 1))
+            continue
+        
+        text = ""
+        for line_no, line in enumerate(block.get("lines", [])):
+            word_chars = []
+            word_no = 0
+            for span in line.get("spans", []):
+                for char in span.get("chars", []):
+                    text += char["c"]
+                    if not char["c"].isspace():
+                        word_chars.append(char)
+                        continue
+                    if word_chars:
+                        words.append(_chars_to_word(word_chars, block_no, line_no, word_no))
+                        word_no += 1
+                        word_chars = []
+            if word_chars:
+                words.append(_chars_to_word(word_chars, block_no, line_no, word_no))
+            text += "\n"
+        
+        text_blocks.append((x0, y0, x1, y1, text, block_no, 0))
+    
+    return text_blocks, words
+
+def _chars_to_word(chars, block_no, line_no, word_no):
+    """Build a (x0, y0, x1, y1, word, block_no, line_no, word_no) entry from rawdict chars"""
+    return (
+        min(c["bbox"][0] for c in chars), min(c["bbox"][1] for c in chars),
+        max(c["bbox"][2] for c in chars), max(c["bbox"][3] for c in chars),
+        "".join(c["c"] for c in chars), block_no, line_no, word_no
+    )
+
+def _extract_page_blocks(page, page_idx):
+    """Collect the text blocks of one page as [x0, y0, x1, y1, text, block_no, block_type] lists"""
+    page_blocks = []
+    
+    try:
+        # One text-layout pass per page; the blocks and words views are derived from it
+        text_blocks, words = rawdict_views(page.get_text("rawdict"))
+        
+        # If no blocks found or very few, try with words
+        if len(text_blocks) < 3:
+            print(f"Few blocks found on page {page_idx+1}, trying word extraction")
+            page_blocks.extend(group_words_into_blocks(words))
+        
+        # Otherwise (or if grouping found nothing) keep the meaningful text blocks
+        if len(page_blocks) == 0:
+            for block in text_blocks:
+                if block[6] == 0 and len(block[4].strip()) >= 2:  # Text block with meaningful content
+                    # Create a block in the format [x0, y0, x1, y1, text, block_no, block_type]
+                    page_blocks.append([block[0], block[1], block[2], block[3], block[4], len(page_blocks), 0])
+    except Exception as e:
+        print(f"Error extracting blocks from page {page_idx+1}: {e}")
+    
+    return page_blocks
+
+# Worker pools of the streaming pipeline start from a fresh server process (or a fresh interpreter
+# where forkserver isn't available): forking the parent, which already runs the producer and
+# translation threads, could copy a lock held by one of them into the child
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+# Pages submitted for extraction ahead of the consumer, per extraction worker
+EXTRACT_PAGES_PER_WORKER = 2
+
+# Document opened by each extraction worker process (fitz documents can't be shared across processes)
+_extract_document = None
+
+def _extract_page(pdf_path, page_idx):
+    """Extract the text blocks of one page in a worker process, returning (page_idx, page_blocks)"""
+    global _extract_document
+    if _extract_document is None or _extract_document.name != pdf_path:
+        _extract_document = fitz.open(pdf_path)
+    return page_idx, _extract_page_blocks(_extract_document[page_idx], page_idx)
+
+def iter_page_blocks(pdf_path, page_count):
+    """Yield (page_idx, page_blocks) for each page in order, extracting pages in parallel processes"""
+    # Always in worker processes, even just one: this runs on the producer thread of
+    # translate_pdf_with_images, and PyMuPDF must not be used from two threads at once
+    max_workers = max(1, min((os.cpu_count() or 2) // 2, page_count))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=_MP_CONTEXT) as executor:
+        # Keep a window of pages in flight, submitting the next page as each one is taken, so
+        # extracted pages wait in the caller's bounded queue rather than piling up here
+        futures = deque(
+            executor.submit(_extract_page, pdf_path, page_idx)
+            for page_idx in range(min(page_count, max_workers * EXTRACT_PAGES_PER_WORKER))
+        )
+        next_page = len(futures)
+        while futures:
+            page_idx, page_blocks = futures.popleft().result()
+            if next_page < page_count:
+                futures.append(executor.submit(_extract_page, pdf_path, next_page))
+                next_page += 1
+            print(f"Collected {len(page_blocks)} text blocks from page {page_idx+1}/{page_count}")
+            yield page_idx, page_blocks
+
+def _produce_page_blocks(pdf_path, page_count, page_queue, stop):
+    """Feed iter_page_blocks into a bounded queue until stop is set, ending with None"""
+    try:
+        for item in iter_page_blocks(pdf_path, page_count):
+            if stop.is_set():
+                break
+            page_queue.put(item)
+    except Exception as e:
+        print(f"Error extracting text blocks: {e}")
+    finally:
+        page_queue.put(None)
+
+def translate_pdf_with_images(input_pdf_path, output_pdf_path, source_lang, target_lang, refresh_cache=False):
     """Translate a PDF while preserving images and layout with optimized performance"""
     start_time = time.time()
     try:
@@ -1168,22 +2390,11 @@ def translate_pdf_with_images(input_pdf_path, output_pdf_path, source_lang, targ
             shutil.copy(input_pdf_path, output_pdf_path)
             return True
             
-        # Clear any existing cache for this language pair to ensure fresh translations
-        # This helps avoid issues with stale or incorrect translations
-        try:
-            cache_path = get_cache_path(source_code, target_code)
-            if os.path.exists(cache_path):
-                print(f"Removing existing translation cache for {source_code}->{target_code}")
-                os.remove(cache_path)
-        except Exception as e:
-            print(f"Error clearing cache: {e}")
-        
-        # Load fresh translation cache
-        translation_cache = load_translation_cache(source_code, target_code)
-        print(f"Loaded translation cache with {len(translation_cache)} entries")
-
-        # Create a mapping of original text to translated text for all blocks
-        translation_mapping = {}
+        # Only drop cached translations for this language pair when asked to
+        # (e.g. to get rid of stale or incorrect translations)
+        if refresh_cache:
+            print(f"Removing existing translation cache for {source_code}->{target_code}")
+            clear_translation_cache(source_code, target_code)
         
         # Open the PDF with PyMuPDF
         pdf_document = fitz.open(input_pdf_path)
@@ -1206,425 +2417,137 @@ def translate_pdf_with_images(input_pdf_path, output_pdf_path, source_lang, targ
         except Exception as font_embed_error:
             print(f"Error pre-embedding fonts: {font_embed_error}")
         
-        # Collect all text blocks from all pages first
-        all_text_blocks = []
-        page_blocks_map = {}
-        
-        print("Phase 1: Collecting all text blocks from document...")
-        for page_idx, page in enumerate(pdf_document):
-            page_blocks = []
-            
-            try:
-                # Try multiple text extraction methods for better results
-                # First try with blocks
-                text_blocks = page.get_text("blocks")
-                
-                # If no blocks found or very few, try with words
-                if len(text_blocks) < 3:
-                    print(f"Few blocks found on page {page_idx+1}, trying word extraction")
-                    words = page.get_text("words")
-                    
-                    # Group words into lines
-                    if words:
-                        # Sort words by y-coordinate (top to bottom)
-                        words.sort(key=lambda w: (w[3], w[0]))  # Sort by y0, then x0
-                        
-                        current_line_y = words[0][3]
-                        line_words = []
-                        lines = []
-                        
-                        # Group words into lines based on y-coordinate
-                        for word in words:
-                            if abs(word[3] - current_line_y) < 12:  # If on same line (within 12 points)
-                                line_words.append(word)
-                            else:
-                                # New line
-                                if line_words:
-                                    lines.append(line_words)
-                                line_words = [word]
-                                current_line_y = word[3]
-                        
-                        # Add the last line
-                        if line_words:
-                            lines.append(line_words)
-                        
-                        # Group lines into paragraphs
-                        paragraphs = []
-                        current_para = []
-                        
-                        for line in lines:
-                            if current_para and (line[0][3] - current_para[-1][-1][3]) > 20:
-                                # If vertical gap is large, start a new paragraph
-                                paragraphs.append(current_para)
-                                current_para = [line]
-                            else:
-                                current_para.append(line)
-                        
-                        # Add the last paragraph
-                        if current_para:
-                            paragraphs.append(current_para)
-                        
-                        # Create blocks from paragraphs
-                        for para_idx, para in enumerate(paragraphs):
-                            # Calculate bounding box
-                            x0 = min(w[0] for line in para for w in line)
-                            y0 = min(w[1] for line in para for w in line)
-                            x1 = max(w[2] for line in para for w in line)
-                            y1 = max(w[3] for line in para for w in line)
-                            
-                            # Combine text
-                            text = ""
-                            for line in para:
-                                line_text = " ".join(w[4] for w in line)
-                                text += line_text + "\n"
-                            
-                            if text.strip() and len(text.strip()) >= 2:
-                                block_data = [x0, y0, x1, y1, text, para_idx, 0]
-                                page_blocks.append(block_data)
-                                all_text_blocks.append(text)
-                
-                # If still no blocks, try dict extraction
-                if len(page_blocks) == 0:
-                    dict_text = page.get_text("dict")
-                    if "blocks" in dict_text:
-                        dict_blocks = dict_text["blocks"]
-                        
-                        # Convert dict blocks to the format expected by the block processing code
-                        for block in dict_blocks:
-                            if block.get("type") == 0:  # text block
-                                text = ""
-                                for line in block.get("lines", []):
-                                    for span in line.get("spans", []):
-                                        text += span.get("text", "")
-                                    text += "\n"
-                                
-                                if text.strip() and len(text.strip()) >= 2:
-                                    # Create a block in the format [x0, y0, x1, y1, text, block_no, block_type]
-                                    block_data = [
-                                        block["bbox"][0], block["bbox"][1], 
-                                        block["bbox"][2], block["bbox"][3],
-                                        text, len(page_blocks), 0
-                                    ]
-                                    page_blocks.append(block_data)
-                                    all_text_blocks.append(text)
-                
-                # If we still have standard blocks from the first extraction, process them
-                if text_blocks and len(page_blocks) == 0:
-                    for block in text_blocks:
-                        if block[6] == 0 and len(block[4].strip()) >= 2:  # Text block with meaningful content
-                            page_blocks.append(block)
-                            all_text_blocks.append(block[4])
-            except Exception as e:
-                print(f"Error extracting blocks from page {page_idx+1}: {e}")
-            
-            page_blocks_map[page_idx] = page_blocks
-            print(f"Collected {len(page_blocks)} text blocks from page {page_idx+1}/{len(pdf_document)}")
-        
-        # Deduplicate text blocks to minimize translation requests
-        unique_texts = list(set(all_text_blocks))
-        print(f"Found {len(all_text_blocks)} total blocks, {len(unique_texts)} unique text blocks to translate")
-        
-        # Check cache for existing translations
-        texts_to_translate = []
-        for text in unique_texts:
-            text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-            if text_hash not in translation_cache:
-                texts_to_translate.append(text)
-        
-        print(f"After cache check: {len(texts_to_translate)} blocks need translation")
-        
-        # Phase 2: Translate all unique text blocks in parallel
-        if texts_to_translate:
-            print("Phase 2: Translating unique text blocks in parallel...")
-            
-            # Split into smaller chunks for more reliable translation
-            chunk_size = 5  # Smaller chunk size for better reliability
-            
-            # Create batches of texts
-            batches = []
-            for i in range(0, len(texts_to_translate), chunk_size):
-                batch = texts_to_translate[i:i+chunk_size]
-                batches.append(batch)
-            
-            print(f"Split {len(texts_to_translate)} texts into {len(batches)} batches for parallel translation")
-            
-            # Process batches in parallel with fewer workers for reliability
-            with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-                # Submit translation tasks
-                future_to_batch = {
-                    executor.submit(
-                        lambda b: [(text, translate_chunk(text, source_code, target_code)) for text in b],
-                        batch
-                    ): batch_idx for batch_idx, batch in enumerate(batches)
-                }
-                
-                # Process results as they complete
-                for future in concurrent.futures.as_completed(future_to_batch):
-                    batch_idx = future_to_batch[future]
-                    try:
-                        results = future.result()
-                        for text, translated in results:
-                            if translated and translated.strip():
-                                translation_mapping[text] = translated
-                                # Also update cache
-                                text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-                                translation_cache[text_hash] = translated
-                            else:
-                                print(f"Warning: Empty translation result for text: {text[:30]}...")
-                                translation_mapping[text] = text  # Use original if translation failed
-                        
-                        print(f"Completed batch {batch_idx+1}/{len(batches)}")
-                    except Exception as e:
-                        print(f"Error processing batch {batch_idx+1}: {e}")
-                        # For failed batches, try translating each text individually
+        # Allocate all output pages up front so page order is preserved while the pages
+        # themselves are rendered concurrently (each placeholder is swapped for its rendered page)
+        for page in pdf_document:
+            output_document.new_page(width=page.rect.width, height=page.rect.height)
+        
+        # Stream the document: a producer thread extracts text blocks (in worker processes, each with
+        # its own copy of the document) into a bounded queue while this thread translates a few pages
+        # at a time and hands them to a pool of render processes, at most RENDERS_PER_WORKER pages per
+        # worker at once, so only the pages in flight are held in memory
+        print("Translating and rendering pages as they are extracted...")
+        page_queue = queue.Queue(maxsize=PAGE_QUEUE_SIZE)
+        stop_producer = threading.Event()
+        producer = threading.Thread(
+            target=_produce_page_blocks, args=(input_pdf_path, len(pdf_document), page_queue, stop_producer), daemon=True
+        )
+        producer.start()
+        
+        total_blocks = 0
+        translated_count = 0
+        untouched_pages = []
+        # Rendering is CPU-bound PyMuPDF work, so it runs in processes; even a single worker
+        # overlaps rendering with this thread's translation requests
+        render_workers = max(1, min((os.cpu_count() or 2) // 2, len(pdf_document)))
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=render_workers, mp_context=_MP_CONTEXT) as render_executor:
+                future_to_page = {}
+                # Texts that failed or came back unchanged, kept for the whole document: they aren't
+                # cached, so repeated headers and footers would otherwise go through every fallback
+                # service again in each round
+                untranslated = set()
+                finished = False
+                while not finished:
+                    # Take at least one page, then any pages already extracted, up to the character budget.
+                    # The mapping only covers the pages of this round (repeats across rounds are cache hits,
+                    # or in untranslated), so memory stays bounded by the pages in flight rather than the whole document
+                    pages = []
+                    translation_mapping = {}
+                    new_texts = {}
+                    new_chars = 0
+                    item = page_queue.get()
+                    while item is not None:
+                        pages.append(item)
+                        for block in item[1]:
+                            text = block[4]
+                            if text in translation_mapping:
+                                continue
+                            # Numbers, punctuation and URLs are written back verbatim
+                            if not is_translatable(text):
+                                translation_mapping[text] = text
+                                continue
+                            # Variants differing only in whitespace (line breaks in headers, footers)
+                            # are translated once, under their whitespace-collapsed form
+                            canonical = " ".join(text.split())
+                            if canonical in untranslated:
+                                translation_mapping[text] = text
+                                continue
+                            variants = new_texts.get(canonical)
+                            if variants is None:
+                                variants = new_texts[canonical] = []
+                                new_chars += len(canonical)
+                            if text not in variants:
+                                variants.append(text)
+                        if new_chars >= PAGE_BATCH_CHARS:
+                            break
                         try:
-                            batch = batches[batch_idx]
-                            print(f"Retrying batch {batch_idx+1} texts individually")
-                            for text in batch:
-                                try:
-                                    translated = translate_chunk(text, source_code, target_code)
-                                    if translated and translated.strip():
-                                        translation_mapping[text] = translated
-                                        text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-                                        translation_cache[text_hash] = translated
-                                    else:
-                                        translation_mapping[text] = text
-                                except Exception as text_error:
-                                    print(f"Error translating individual text: {text_error}")
-                                    translation_mapping[text] = text
-                        except Exception as retry_error:
-                            print(f"Error in batch retry: {retry_error}")
-            
-            # Save updated cache
-            save_translation_cache(translation_cache, source_code, target_code)
-        else:
-            print("All text blocks found in cache, skipping translation phase")
-        
-        # Add cache entries to translation mapping
-        for text in unique_texts:
-            if text not in translation_mapping:
-                text_hash = hashlib.md5(text.encode('utf-8')).hexdigest()
-                if text_hash in translation_cache:
-                    translation_mapping[text] = translation_cache[text_hash]
-                else:
-                    # Fallback if somehow not in cache
-                    translation_mapping[text] = text
-        
-        # Phase 3: Create output PDF with translations
-        print("Phase 3: Creating output PDF with translations...")
-        for page_idx, page in enumerate(pdf_document):
-            print(f"Processing page {page_idx+1}/{len(pdf_document)}")
-            
-            # Create a new page with the same dimensions
-            new_page = output_document.new_page(width=page.rect.width, height=page.rect.height)
-            
-            # First, copy the entire page as background (preserves all images and layout)
-            new_page.show_pdf_page(
-                new_page.rect,
-                pdf_document,
-                page_idx,
-                clip=None,
-                keep_proportion=True,
-                overlay=False,
-                oc=0,
-                rotate=0
-            )
-            
-            # Process text blocks for this page
-            page_blocks = page_blocks_map.get(page_idx, [])
-            
-            # If no blocks were found, try to extract text directly from the page
-            if len(page_blocks) == 0:
-                print(f"No text blocks found on page {page_idx+1}, trying direct text extraction")
-                try:
-                    # Get all text from the page
-                    page_text = page.get_text()
-                    if page_text and len(page_text.strip()) > 10:
-                        # Create a single block covering the whole page
-                        page_blocks = [[
-                            10,  # x0 - leave margin
-                            10,  # y0 - leave margin
-                            page.rect.width - 10,  # x1
-                            page.rect.height - 10,  # y1
-                            page_text,
-                            0,  # block number
-                            0   # block type (text)
-                        ]]
-                        print(f"Created a single block with {len(page_text)} characters")
-                except Exception as e:
-                    print(f"Error extracting text directly from page {page_idx+1}: {e}")
-            
-            # Process each text block
-            for block_idx, block in enumerate(page_blocks):
-                # Process text block
-                rect = fitz.Rect(block[:4])
-                text = block[4]
-                
-                try:
-                    # Skip very short or empty blocks
-                    if not text or len(text.strip()) < 2:
-                        continue
-                        
-                    # Get translation for this text
-                    translated = translation_mapping.get(text, text)
-                    
-                    # Skip if translation is empty or identical to original
-                    if not translated.strip() or translated == text:
-                        continue
-                    
-                    # Create a white rectangle to cover the original text
-                    # Use a slightly transparent white to blend better with background
-                    # Try to detect the background color for better blending
-                    try:
-                        # Sample the background color near the text block
-                        bg_color = (1, 1, 1)  # Default to white
-                        
-                        # Get the page pixmap
-                        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-                        
-                        # Sample points around the text block
-                        sample_points = [
-                            (max(0, int(rect.x0) - 5), max(0, int(rect.y0) - 5)),
-                            (min(pix.width - 1, int(rect.x1) + 5), max(0, int(rect.y0) - 5)),
-                            (max(0, int(rect.x0) - 5), min(pix.height - 1, int(rect.y1) + 5)),
-                            (min(pix.width - 1, int(rect.x1) + 5), min(pix.height - 1, int(rect.y1) + 5))
-                        ]
-                        
-                        # Get average color
-                        r_sum, g_sum, b_sum = 0, 0, 0
-                        for x, y in sample_points:
-                            if 0 <= x < pix.width and 0 <= y < pix.height:
-                                pixel = pix.pixel(x, y)
-                                r, g, b = pixel[0] / 255, pixel[1] / 255, pixel[2] / 255
-                                r_sum += r
-                                g_sum += g
-                                b_sum += b
-                        
-                        if sample_points:
-                            bg_color = (r_sum / len(sample_points), g_sum / len(sample_points), b_sum / len(sample_points))
-                        
-                        # Draw rectangle with detected background color
-                        # PyMuPDF version compatibility - older versions don't support opacity
-                        new_page.draw_rect(rect, color=bg_color, fill=bg_color)
-                    except Exception as color_error:
-                        print(f"Error detecting background color: {color_error}, using white")
-                        # Fallback to white background
-                        new_page.draw_rect(rect, color=(1, 1, 1), fill=(1, 1, 1))
-                    
-                    # Calculate appropriate font size based on original text and translation length
-                    original_len = len(text.strip())
-                    translated_len = len(translated.strip())
-                    
-                    # Base font size on text length ratio and available space
-                    ratio = min(1.0, original_len / max(1, translated_len))
-                    fontsize = max(8, 11 * ratio)  # Minimum 8pt, maximum 11pt
-                    
-                    # Use standard built-in fonts that are guaranteed to be available in all PDFs
-                    is_heading = rect.y0 < 100 or len(text.strip()) < 50
-                    fontname = "Helvetica-Bold" if is_heading else "Helvetica"
-                    
-                    # Determine text color - use black for light backgrounds, white for dark backgrounds
-                    text_color = (0, 0, 0)  # Default to black
-                    try:
-                        # Calculate background brightness (simple average)
-                        if 'bg_color' in locals():
-                            brightness = sum(bg_color) / 3
-                            # Use white text on dark backgrounds
-                            if brightness < 0.5:
-                                text_color = (1, 1, 1)
-                    except:
-                        pass
-                    
-                    # Insert the translated text with word wrapping
-                    # Expand the rectangle slightly to accommodate longer translations
-                    expanded_rect = fitz.Rect(
-                        rect.x0,
-                        rect.y0,
-                        rect.x1 + 20,  # Add extra width
-                        rect.y1 + 10    # Add extra height
-                    )
+                            item = page_queue.get_nowait()
+                        except queue.Empty:
+                            break
+                    finished = item is None
                     
-                    # Try multiple font sizes if needed
-                    text_inserted = -1
+                    # Translate this round's texts (translate_batch serves repeats from the cache)
+                    if new_texts:
+                        texts_to_translate = list(new_texts)
+                        translated_count += len(texts_to_translate)
+                        translated_texts = translate_batch(texts_to_translate, source_code, target_code)
+                        for canonical, translated in zip(texts_to_translate, translated_texts):
+                            if translated == canonical:
+                                untranslated.add(canonical)
+                            for text in new_texts[canonical]:
+                                # An untranslated text keeps its original whitespace
+                                translation_mapping[text] = text if translated == canonical else translated
                     
-                    # List of fallback fonts to try
-                    fallback_fonts = ["Helvetica", "Times-Roman", "Courier"]
+                    for page_idx, page_blocks in pages:
+                        total_blocks += len(page_blocks)
+                        # Pages where nothing changes are copied as they are once rendering is done
+                        if not has_translated_blocks(page_blocks, translation_mapping):
+                            untouched_pages.append(page_idx)
+                            continue
+                        # Only this page's translations are sent to the worker
+                        page_mapping = {block[4]: translation_mapping[block[4]] for block in page_blocks if block[4] in translation_mapping}
+                        future_to_page[render_executor.submit(
+                            _render_page_pdf,
+                            input_pdf_path,
+                            page_idx,
+                            page_mapping,
+                            page_blocks
+                        )] = page_idx
+                        # Wait for renders to finish rather than queueing up the whole document
+                        while len(future_to_page) >= render_workers * RENDERS_PER_WORKER:
+                            concurrent.futures.wait(future_to_page, return_when=concurrent.futures.FIRST_COMPLETED)
+                            _collect_rendered_pages(pdf_document, output_document, future_to_page)
                     
-                    # Try different fonts and sizes
-                    success = False
-                    for current_font in fallback_fonts:
-                        if success:
-                            break
-                            
-                        for attempt in range(3):
-                            try:
-                                # Insert the translated text with word wrapping
-                                text_inserted = new_page.insert_textbox(
-                                    expanded_rect,
-                                    translated,
-                                    fontsize=fontsize,
-                                    fontname=current_font,
-                                    color=text_color,
-                                    align=0
-                                )
-                                
-                                # If text fit successfully, break the loop
-                                if text_inserted >= 0:
-                                    success = True
-                                    break
-                                    
-                                # If text didn't fit, reduce font size for next attempt
-                                fontsize = max(6, fontsize * 0.8)  # Reduce font size by 20%, minimum 6pt
-                            except Exception as font_error:
-                                print(f"Font error with {current_font}: {font_error}, trying next font or size")
-                                fontsize = max(6, fontsize * 0.8)  # Reduce font size for next attempt
-                    
-                    # If all attempts failed, try a simpler approach with text insertion
-                    if not success:
-                        try:
-                            # Further expand rectangle and use minimum font size
-                            wider_rect = fitz.Rect(
-                                rect.x0,
-                                rect.y0,
-                                rect.x1 + 40,  # Add even more width
-                                rect.y1 + 20   # Add even more height
-                            )
-                            
-                            # Try with the simplest text insertion method
-                            try:
-                                # Try insert_text instead of insert_textbox
-                                new_page.insert_text(
-                                    point=(rect.x0, rect.y0 + 10),
-                                    text=translated[:100] + ("..." if len(translated) > 100 else ""),
-                                    fontsize=6,
-                                    color=text_color
-                                )
-                                success = True
-                            except Exception as text_error:
-                                print(f"Simple text insertion failed: {text_error}")
-                                
-                                # Last resort: try to draw text directly
-                                try:
-                                    # Create a simple text annotation
-                                    annot = new_page.add_text_annot(
-                                        rect.tl,  # top-left point
-                                        translated[:50] + ("..." if len(translated) > 50 else ""),
-                                        icon="Note"
-                                    )
-                                    success = True
-                                except Exception as annot_error:
-                                    print(f"Text annotation failed: {annot_error}")
-                        except Exception as last_error:
-                            print(f"All text insertion methods failed: {last_error}")
-                except Exception as e:
-                    print(f"Error processing block {block_idx} on page {page_idx+1}: {e}")
-                    import traceback
-                    traceback.print_exc()
-            
-            print(f"Finished processing page {page_idx+1}")
-        
-        # Save the translated document
-        output_document.save(output_pdf_path)
+                    # Insert the pages rendered so far so their bytes don't pile up
+                    _collect_rendered_pages(pdf_document, output_document, future_to_page)
+                
+                _collect_rendered_pages(pdf_document, output_document, future_to_page, wait=True)
+        finally:
+            # Stop the producer, taking pages off the queue in case it is blocked on a full one
+            stop_producer.set()
+            while producer.is_alive():
+                try:
+                    page_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            producer.join()
+        flush_translation_cache()
+        print(f"Translated {total_blocks} blocks ({translated_count} texts sent for translation)")
+        
+        # Replace the placeholders of untouched pages with the source pages themselves, one
+        # insert_pdf per run of consecutive pages (this also keeps their links and annotations)
+        if untouched_pages:
+            print(f"Copying {len(untouched_pages)} pages without translated text unchanged")
+        for first_idx, last_idx in page_runs(sorted(untouched_pages)):
+            output_document.delete_pages(first_idx, last_idx)
+            output_document.insert_pdf(pdf_document, from_page=first_idx, to_page=last_idx, start_at=first_idx)
+        
+        # Save the translated document; pages rendered in separate processes each carry their
+        # own copy of shared fonts and images, which garbage=4 merges back into one, and
+        # compressing streams keeps both the written file and the save buffer small
+        output_document.save(output_pdf_path, garbage=4, deflate=True, deflate_images=True,
+                             deflate_fonts=True, clean=True)
         output_document.close()
         pdf_document.close()
         
@@ -1660,7 +2583,7 @@ if __name__ == "__main__":
         sys.exit(0)
     
     elif args.command == 'translate':
-        success = translate_text(args.input_path, args.output_path, args.source_lang, args.target_lang)
+        success = translate_text(args.input_path, args.output_path, args.source_lang, args.target_lang, args.refresh_cache)
         sys.exit(0 if success else 1)
     
     elif args.command == 'create_pdf':
@@ -1682,7 +2605,8 @@ if __name__ == "__main__":
             args.input_path,
             args.output_path,
             args.source_lang,
-            args.target_lang
+            args.target_lang,
+            args.refresh_cache
         )
         sys.exit(0 if success else 1)
     
@@ -13,19 +13,42 @@ import tempfile
 import uuid
 import time
 import re
+import concurrent.futures
+import threading
 from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
 from reportlab.lib.styles import ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+from xml.sax.saxutils import escape
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_LEFT
 from reportlab.lib import colors
 
+# Text with no letters at all (numbers, dates, punctuation) comes back from the translator unchanged
+_UNTRANSLATABLE = re.compile(r'^[\W\d_]+$')
+
+def needs_translation(text):
+    """Whether text has anything a translator could change: at least 2 characters, some of them letters"""
+    return len(text.strip()) >= 2 and not _UNTRANSLATABLE.match(text)
+
+# GoogleTranslator keeps the request being built on the instance, so the paragraph
+# groups translated concurrently each get their own per thread and language pair
+_tls = threading.local()
+
+def get_translator(source_lang, target_lang):
+    """Return this thread's GoogleTranslator for the language pair, creating it on first use"""
+    translators = getattr(_tls, 'translators', None)
+    if translators is None:
+        translators = _tls.translators = {}
+    translator = translators.get((source_lang, target_lang))
+    if translator is None:
+        translator = translators[(source_lang, target_lang)] = GoogleTranslator(source=source_lang, target=target_lang)
+    return translator
+
 def translate_text(text, source_lang="es", target_lang="en"):
     """Translate text with multiple fallback options and retries"""
     
-    # Safety check for empty or whitespace text
-    if not text or text.isspace() or len(text) < 2:
+    # Safety check for empty, whitespace or letterless text, which would only use up retries
+    if not text or text.isspace() or len(text) < 2 or _UNTRANSLATABLE.match(text):
         return text
         
     # Don't translate if same language
@@ -46,8 +69,8 @@ def translate_text(text, source_lang="es", target_lang="en"):
     while attempts < max_attempts:
         try:
             attempts += 1
-            # Create translator with source and target languages
-            translator = GoogleTranslator(source=source_lang, target=target_lang)
+            # Reuse this thread's translator for the language pair
+            translator = get_translator(source_lang, target_lang)
             
             # Translate text
             translated = translator.translate(text)
@@ -70,6 +93,40 @@ def translate_text(text, source_lang="es", target_lang="en"):
     print("WARNING: All translation attempts failed, returning original text")
     return text
 
+# Several paragraphs are sent per request, joined by a record separator symbol that
+# the translator passes through; Google accepts up to 5000 characters per request
+BATCH_SEPARATOR = "\n\u241E\n"
+BATCH_CHAR_LIMIT = 4500
+
+def pack_paragraphs(paragraphs, max_chars=BATCH_CHAR_LIMIT):
+    """Group consecutive paragraphs so that each group joined with BATCH_SEPARATOR fits in max_chars"""
+    groups = []
+    current = []
+    size = 0
+    for para in paragraphs:
+        added = len(para) + (len(BATCH_SEPARATOR) if current else 0)
+        if current and size + added > max_chars:
+            groups.append(current)
+            current = []
+            size = 0
+            added = len(para)
+        current.append(para)
+        size += added
+    if current:
+        groups.append(current)
+    return groups
+
+def translate_group(paragraphs, source_lang="es", target_lang="en"):
+    """Translate a group of paragraphs in one request, or one by one if the separators get lost"""
+    if len(paragraphs) > 1:
+        translated = translate_text(BATCH_SEPARATOR.join(paragraphs), source_lang, target_lang)
+        parts = [part.strip() for part in translated.split("\u241E")]
+        if len(parts) == len(paragraphs):
+            return parts
+        print(f"Batch of {len(paragraphs)} paragraphs came back as {len(parts)} parts, translating one by one")
+    
+    return [translate_text(para, source_lang, target_lang) for para in paragraphs]
+
 def extract_text_from_pdf(pdf_path):
     """Extract text from PDF in a simple format"""
     try:
@@ -81,15 +138,8 @@ def extract_text_from_pdf(pdf_path):
             page = doc[page_num]
             text = page.get_text()
             
-            # Clean up the text
-            lines = text.split('\n')
-            clean_lines = []
-            for line in lines:
-                if line.strip():
-                    clean_lines.append(line.strip())
-            
-            # Join cleaned lines with newlines
-            clean_text = '\n'.join(clean_lines)
+            # Strip every line and drop the blank ones (splitlines and str.strip both run in C)
+            clean_text = '\n'.join([line for line in map(str.strip, text.splitlines()) if line])
             text_content.append(clean_text)
             
         doc.close()
@@ -101,47 +151,33 @@ def extract_text_from_pdf(pdf_path):
 def create_simple_text_pdf(text_content, output_path):
     """Create a very simple PDF with just text - no fancy formatting"""
     try:
-        c = canvas.Canvas(output_path, pagesize=letter)
-        width, height = letter
+        # ReportLab lays out the lines and breaks pages itself, with a standard
+        # font that's guaranteed to be available and 1 inch margins
+        doc = SimpleDocTemplate(
+            output_path,
+            pagesize=letter,
+            leftMargin=1 * inch,
+            rightMargin=1 * inch,
+            topMargin=1 * inch,
+            bottomMargin=1 * inch
+        )
+        style = ParagraphStyle('PlainText', fontName="Helvetica", fontSize=12, leading=12 * 1.2, alignment=TA_LEFT)
         
-        # Set font to a standard font that's guaranteed to be available
-        font_name = "Helvetica"
-        font_size = 12
-        line_height = font_size * 1.2
-        
-        # Set margins
-        left_margin = 1 * inch
-        top_margin = height - 1 * inch
-        
-        for page_text in text_content:
-            # Split text into lines
-            lines = page_text.split("\n")
-            
-            # Start at top margin
-            y_position = top_margin
+        story = []
+        for page_num, page_text in enumerate(text_content):
+            # Start each original page on a new page
+            if page_num:
+                story.append(PageBreak())
             
-            for line in lines:
-                # Skip empty lines
-                if not line.strip():
-                    y_position -= line_height / 2
-                    continue
-                
-                # Draw text
-                c.setFont(font_name, font_size)
-                c.drawString(left_margin, y_position, line)
-                
-                # Move down for next line
-                y_position -= line_height
-                
-                # If we've reached the bottom margin, start a new page
-                if y_position < 1 * inch:
-                    c.showPage()
-                    y_position = top_margin
-            
-            # Add a page break after each original page
-            c.showPage()
+            for line in page_text.split("\n"):
+                if line.strip():
+                    # Paragraph text is markup, so escape &, < and >
+                    story.append(Paragraph(escape(line), style))
+                else:
+                    # Half a line of space for empty lines
+                    story.append(Spacer(1, style.leading / 2))
         
-        c.save()
+        doc.build(story)
         return True
     except Exception as e:
         print(f"Error creating PDF: {e}")
@@ -174,22 +210,39 @@ def pure_text_translate_pdf(input_path, output_path, source_lang="es", target_la
         
         print(f"Extracted {len(page_texts)} pages of text")
         
-        # Translate each page
+        # Split every page into paragraphs
+        page_paragraphs = []
+        for page_text in page_texts:
+            page_paragraphs.append([para for para in page_text.split('\n\n') if para.strip()])
+        all_paragraphs = [para for paragraphs in page_paragraphs for para in paragraphs]
+        
+        # Paragraphs that are only numbers or symbols, or a single character, are kept as they are
+        pending = [i for i, para in enumerate(all_paragraphs) if needs_translation(para)]
+        translated_paragraphs = list(all_paragraphs)
+        
+        # Pack the rest into as few requests as possible and send those concurrently;
+        # the requests are network-bound, and map() returns the results in paragraph order
+        groups = pack_paragraphs([all_paragraphs[i] for i in pending])
+        print(f"Translating {len(pending)} of {len(all_paragraphs)} paragraphs in {len(groups)} requests...")
+        results = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
+            for translated_group in executor.map(
+                lambda group: translate_group(group, source_lang, target_lang),
+                groups
+            ):
+                results.extend(translated_group)
+        for i, translated_para in zip(pending, results):
+            translated_paragraphs[i] = translated_para
+        
+        # Rebuild each page
         translated_pages = []
-        for i, page_text in enumerate(page_texts):
-            print(f"Translating page {i+1}/{len(page_texts)}...")
-            
+        position = 0
+        for i, paragraphs in enumerate(page_paragraphs):
             # Add page header
             translated_page = f"--- Page {i+1} ---\n\n"
-            
-            # Split into paragraphs and translate each
-            paragraphs = page_text.split('\n\n')
-            for para in paragraphs:
-                if not para.strip():
-                    continue
-                    
-                translated_para = translate_text(para, source_lang, target_lang)
+            for translated_para in translated_paragraphs[position:position + len(paragraphs)]:
                 translated_page += translated_para + "\n\n"
+            position += len(paragraphs)
             
             translated_pages.append(translated_page)
         
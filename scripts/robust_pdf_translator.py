@@ -12,103 +12,504 @@ import tempfile
 import argparse
 from deep_translator import GoogleTranslator
 import concurrent.futures
+import multiprocessing
 import json
 import re
+import sqlite3
+import hashlib
+import threading
+import queue
+import itertools
+import asyncio
+from collections import deque
+try:
+    # Optional: one keep-alive HTTP session for all batches instead of a thread per request
+    import aiohttp
+except ImportError:
+    aiohttp = None
+try:
+    # Optional: font sizes for a whole page in one vector operation
+    import numpy as np
+except ImportError:
+    np = None
 
-def extract_text_blocks(pdf_path):
-    """Extract text blocks from a PDF file"""
+# Pages extracted per worker task, and shards submitted ahead of the consumer per worker
+PAGES_PER_SHARD = 8
+SHARDS_PER_WORKER = 2
+# Extraction runs beside the pipeline's translation and rendering threads, so its workers start
+# from a fresh server process (or interpreter) rather than a fork of this threaded one
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+def _extract_shard(pdf_path, first_page, last_page):
+    """Text blocks of pages first_page to last_page - 1, read from this process's own handle"""
     blocks = []
+    doc = fitz.open(pdf_path)
     try:
-        # Open the PDF
-        doc = fitz.open(pdf_path)
-        
-        # Extract text blocks from each page
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            page_blocks = page.get_text("blocks")
-            
-            for block in page_blocks:
-                # Each block is (x0, y0, x1, y1, text, block_no, block_type)
+        for page_num in range(first_page, last_page):
+            for block in doc[page_num].get_text("blocks"):
+                # Each block is (x0, y0, x1, y1, text, block_no, block_type); only the page,
+                # rect (kept as the tuple slice) and text are used later
                 if block[4].strip():  # Only include non-empty blocks
                     blocks.append({
                         "page": page_num,
-                        "rect": [block[0], block[1], block[2], block[3]],
-                        "text": block[4],
-                        "block_no": block[5],
-                        "block_type": block[6]
+                        "rect": block[:4],
+                        "text": block[4]
                     })
-        
+    finally:
         doc.close()
-        return blocks
+    return blocks
+
+def iter_page_blocks(pdf_path):
+    """Yield (page_num, blocks) for each page with text, in page order, extracting shards in parallel processes"""
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+    
+    shards = iter([(first, min(first + PAGES_PER_SHARD, page_count)) for first in range(0, page_count, PAGES_PER_SHARD)])
+    # Always in worker processes, even just one: in translate_pdf this runs on a feeder thread
+    # while the main thread renders, and PyMuPDF must not be used from two threads at once
+    max_workers = max(1, min((page_count + PAGES_PER_SHARD - 1) // PAGES_PER_SHARD, os.cpu_count() or 1))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers, mp_context=_MP_CONTEXT) as executor:
+        # Keep a window of shards in flight, submitting the next one as each is taken, so
+        # extracted pages wait in the pipeline's bounded queues rather than piling up here
+        futures = deque(
+            executor.submit(_extract_shard, pdf_path, first, last)
+            for first, last in itertools.islice(shards, max_workers * SHARDS_PER_WORKER)
+        )
+        while futures:
+            shard_blocks = futures.popleft().result()
+            next_shard = next(shards, None)
+            if next_shard is not None:
+                futures.append(executor.submit(_extract_shard, pdf_path, *next_shard))
+            for page_num, page_blocks in itertools.groupby(shard_blocks, key=lambda block: block["page"]):
+                yield page_num, list(page_blocks)
+
+def extract_text_blocks(pdf_path):
+    """Extract text blocks from a PDF file as {page_num: blocks}, shards of pages in parallel processes"""
+    try:
+        # The blocks already come grouped by page
+        return dict(iter_page_blocks(pdf_path))
     except Exception as e:
         print(f"Error extracting text blocks: {e}")
-        return []
+        return {}
+
+# Translations made so far, so repeated headers, footers and labels are only sent once; they are also kept
+# on disk for 14 days, shared with the other standalone translators, so reruns skip the API
+_TRANSLATION_CACHE = {}
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "pdf_translator_cache")
+CACHE_DB_PATH = os.path.join(CACHE_DIR, "translations.db")
+CACHE_TTL = 14 * 24 * 3600
+_cache_lock = threading.Lock()
+_cache_db = None
+
+def normalize_text(text):
+    """Text with whitespace runs collapsed, so layout variants of the same text compare equal"""
+    return re.sub(r"\s+", " ", text).strip()
+
+def translation_cache_key(text, source_lang, target_lang):
+    """Cache key for a text, with whitespace runs collapsed so layout variants share an entry"""
+    return (normalize_text(text), source_lang, target_lang)
+
+def _open_cache():
+    """Open the on-disk translation cache on first use (caller holds the lock), returning None if unavailable"""
+    global _cache_db
+    if _cache_db is None:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            _cache_db = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+            _cache_db.execute("PRAGMA journal_mode=WAL")
+            _cache_db.execute(
+                "CREATE TABLE IF NOT EXISTS translations("
+                "hash TEXT, src TEXT, tgt TEXT, translated TEXT, ts INTEGER, PRIMARY KEY (hash, src, tgt))"
+            )
+        except sqlite3.Error as e:
+            print(f"Translation cache unavailable: {e}")
+            _cache_db = False
+    return _cache_db or None
+
+def get_cached_translation(key):
+    """Look up a translation in memory, then on disk, returning None on a miss"""
+    if key in _TRANSLATION_CACHE:
+        return _TRANSLATION_CACHE[key]
+    text, source_lang, target_lang = key
+    try:
+        with _cache_lock:
+            db = _open_cache()
+            if db is None:
+                return None
+            row = db.execute(
+                "SELECT translated FROM translations WHERE hash=? AND src=? AND tgt=? AND ts>?",
+                (hashlib.md5(text.encode('utf-8')).hexdigest(), source_lang, target_lang, int(time.time()) - CACHE_TTL)
+            ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Error reading translation cache: {e}")
+        return None
+    if row:
+        _TRANSLATION_CACHE[key] = row[0]
+        return row[0]
+    return None
+
+def save_cached_translation(key, translated):
+    """Store a translation in memory and on disk"""
+    save_cached_translations([(key, translated)])
+
+def save_cached_translations(items):
+    """Store (key, translation) pairs in memory and on disk in one transaction"""
+    rows = []
+    now = int(time.time())
+    for key, translated in items:
+        _TRANSLATION_CACHE[key] = translated
+        text, source_lang, target_lang = key
+        rows.append((hashlib.md5(text.encode('utf-8')).hexdigest(), source_lang, target_lang, translated, now))
+    if not rows:
+        return
+    try:
+        with _cache_lock:
+            db = _open_cache()
+            if db is not None:
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO translations(hash, src, tgt, translated, ts) VALUES (?, ?, ?, ?, ?)",
+                        rows
+                    )
+    except sqlite3.Error as e:
+        print(f"Error saving translation cache: {e}")
+
+# Page numbers, figure counters, symbols and bare links come back unchanged,
+# so they are never worth a request
+_NOOP = re.compile(r'^[\W\d_]+$|^(?:https?://|www\.)\S+$')
+
+def needs_translation(text):
+    """Check whether text has anything a translator would change"""
+    text = text.strip()
+    return len(text) >= 2 and not _NOOP.match(text)
 
 def translate_text(text, source_lang, target_lang):
     """Translate text from source language to target language"""
     if not text.strip():
         return ""
     
-    # Skip translation if languages are the same
-    if source_lang == target_lang:
+    # Skip translation if languages are the same or there is nothing to translate
+    if source_lang == target_lang or not needs_translation(text):
         return text
     
+    translated = try_translate_text(text, source_lang, target_lang)
+    # If all translation attempts fail, keep the original text
+    return text if translated is None else translated
+
+def try_translate_text(text, source_lang, target_lang):
+    """Translate text from source language to target language, returning None if every attempt fails"""
+    key = translation_cache_key(text, source_lang, target_lang)
+    cached = get_cached_translation(key)
+    if cached is not None:
+        return cached
+    
+    translated = send_text(text, source_lang, target_lang)
+    if translated is not None:
+        save_cached_translation(key, translated)
+    return translated
+
+def send_text(text, source_lang, target_lang):
+    """Send text to the translator without the cache, returning None if every attempt fails"""
     try:
         translator = GoogleTranslator(source=source_lang, target=target_lang)
-        translated = translator.translate(text)
-        return translated
+        return translator.translate(text)
     except Exception as e:
         print(f"Translation error: {e}")
         # Try with auto-detection
         try:
             print("Trying with auto-detection...")
             translator = GoogleTranslator(source='auto', target=target_lang)
-            translated = translator.translate(text)
-            return translated
+            return translator.translate(text)
         except Exception as auto_error:
             print(f"Auto-detection also failed: {auto_error}")
-            # If all translation attempts fail, keep the original text
-            return text
+            return None
+
+# Several blocks are sent per request, joined by a record separator symbol that
+# the translator passes through; Google accepts up to 5000 characters per request
+BATCH_SEPARATOR = "\n\u241E\n"
+BATCH_CHAR_LIMIT = 4500
+
+def pack_blocks(blocks, max_chars=BATCH_CHAR_LIMIT):
+    """Group consecutive blocks so that each group's texts joined with BATCH_SEPARATOR fit in max_chars"""
+    batches = []
+    current = []
+    size = 0
+    for block in blocks:
+        added = len(block["text"]) + (len(BATCH_SEPARATOR) if current else 0)
+        if current and size + added > max_chars:
+            batches.append(current)
+            current = []
+            size = 0
+            added = len(block["text"])
+        current.append(block)
+        size += added
+    if current:
+        batches.append(current)
+    return batches
+
+def split_batch(translated, count):
+    """Split a translated batch back into its `count` parts, or None if the separators got lost"""
+    parts = [part.strip() for part in translated.split("\u241E")]
+    return parts if len(parts) == count else None
+
+GOOGLE_TRANSLATE_URL = "https://translate.googleapis.com/translate_a/single"
+
+# Concurrency of the async path is tuned while it runs: it doubles every CONCURRENCY_WINDOW
+# error-free requests while latency holds steady, and halves on rate limiting, server errors
+# or timeouts. The last value is kept for the next run to start from.
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = 32
+DEFAULT_CONCURRENCY = 4
+CONCURRENCY_WINDOW = 8
+THROTTLE_BACKOFF = 2.0
+CONCURRENCY_STATE_PATH = os.path.join(CACHE_DIR, "robust_concurrency.json")
 
-def translate_blocks(blocks, source_lang, target_lang, max_workers=5):
-    """Translate all text blocks in parallel"""
-    # Group blocks into batches to avoid too many concurrent requests
-    batch_size = 5
-    batches = [blocks[i:i + batch_size] for i in range(0, len(blocks), batch_size)]
+def load_concurrency():
+    """Concurrency the last run ended with, or DEFAULT_CONCURRENCY"""
+    try:
+        with open(CONCURRENCY_STATE_PATH) as f:
+            return max(MIN_CONCURRENCY, min(MAX_CONCURRENCY, int(json.load(f)["concurrency"])))
+    except (OSError, ValueError, KeyError, TypeError):
+        return DEFAULT_CONCURRENCY
+
+def save_concurrency(concurrency):
+    """Remember the tuned concurrency for the next run"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(CONCURRENCY_STATE_PATH, "w") as f:
+            json.dump({"concurrency": concurrency}, f)
+    except OSError as e:
+        print(f"Error saving concurrency: {e}")
+
+def adjust_concurrency(limiter, latency, ok, throttled, epoch):
+    """Update the limiter after one request started in `epoch`: halve when throttled, double after a clean window"""
+    if throttled:
+        # Requests already in flight when the limit was last halved belong to an older epoch;
+        # their throttling is what that decrease answered, so one burst halves only once
+        if epoch == limiter["epoch"]:
+            limiter["limit"] = max(MIN_CONCURRENCY, limiter["limit"] // 2)
+            limiter["epoch"] += 1
+            limiter["window"] = limiter["window_errors"] = 0
+            print(f"Throttled, concurrency down to {limiter['limit']}")
+        return
     
-    translated_blocks = []
+    ema = limiter["latency"]
+    limiter["latency"] = latency if ema is None else 0.8 * ema + 0.2 * latency
+    limiter["window"] += 1
+    limiter["window_errors"] += not ok
+    if limiter["window"] >= CONCURRENCY_WINDOW:
+        # Grow only while requests succeed and are not getting slower
+        steady = limiter["window_latency"] is None or limiter["latency"] <= limiter["window_latency"] * 1.1
+        if not limiter["window_errors"] and steady and limiter["limit"] < MAX_CONCURRENCY:
+            limiter["limit"] = min(MAX_CONCURRENCY, limiter["limit"] * 2)
+            print(f"Concurrency up to {limiter['limit']}")
+        limiter["window_latency"] = limiter["latency"]
+        limiter["window"] = limiter["window_errors"] = 0
+
+async def _translate_one(session, limiter, text, source_lang, target_lang, timeout):
+    """Translate one text with Google's gtx endpoint, returning None on failure"""
+    async def request():
+        # POST, since a full batch is too long for the query string
+        async with session.post(
+            GOOGLE_TRANSLATE_URL,
+            params={'client': 'gtx', 'sl': source_lang, 'tl': target_lang, 'dt': 't'},
+            data={'q': text}
+        ) as response:
+            response.raise_for_status()
+            data = await response.json(content_type=None)
+        # The response is [[[translated, original, ...], ...], ...], one entry per sentence
+        return "".join(segment[0] for segment in data[0] if segment and segment[0])
+    
+    condition = limiter["condition"]
+    async with condition:
+        await condition.wait_for(lambda: limiter["in_flight"] < limiter["limit"])
+        limiter["in_flight"] += 1
+        epoch = limiter["epoch"]
+    
+    start = time.monotonic()
+    throttled = False
+    try:
+        result = await asyncio.wait_for(request(), timeout)
+    except Exception as e:
+        print(f"Async translation error: {e}")
+        result = None
+        status = getattr(e, "status", 0)
+        throttled = isinstance(e, asyncio.TimeoutError) or status == 429 or status >= 500
+    latency = time.monotonic() - start
     
+    # A throttled request keeps its slot through the backoff so the others slow down too
+    if throttled:
+        await asyncio.sleep(THROTTLE_BACKOFF)
+    async with condition:
+        limiter["in_flight"] -= 1
+        adjust_concurrency(limiter, latency, result is not None, throttled, epoch)
+        condition.notify_all()
+    return result
+
+async def translate_texts_async(texts, source_lang, target_lang, timeout=30):
+    """Translate texts concurrently over one keep-alive session, tuning how many are in flight"""
+    limiter = {
+        "condition": asyncio.Condition(),
+        "limit": load_concurrency(),
+        "in_flight": 0,
+        "epoch": 0,
+        "latency": None,
+        "window": 0,
+        "window_errors": 0,
+        "window_latency": None
+    }
+    print(f"Starting async translation at concurrency {limiter['limit']}")
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENCY)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        results = await asyncio.gather(
+            *(_translate_one(session, limiter, text, source_lang, target_lang, timeout) for text in texts)
+        )
+    save_concurrency(limiter["limit"])
+    return results
+
+def translate_batches_async(batches, source_lang, target_lang):
+    """Translate batches of texts with aiohttp, returning each batch's parts, or None where that failed"""
+    results = [None] * len(batches)
+    if aiohttp is None or source_lang == target_lang:
+        return results
+    
+    # Send every batch at once; the caller caches the blocks of each batch that splits
+    # back cleanly, so joined batches are never cached themselves
+    if not batches:
+        return results
+    try:
+        responses = asyncio.run(translate_texts_async(
+            [BATCH_SEPARATOR.join(texts) for texts in batches], source_lang, target_lang
+        ))
+    except Exception as e:
+        print(f"Async translation failed: {e}")
+        return results
+    
+    # Split each result back into its blocks; batches that lost separators are left as None
+    for batch_idx, text in enumerate(responses):
+        if text:
+            results[batch_idx] = split_batch(text, len(batches[batch_idx]))
+    return results
+
+def translate_blocks(blocks_by_page, source_lang, target_lang, max_workers=5):
+    """Translate {page_num: blocks}, several blocks per request with the requests in parallel, into the same shape"""
+    blocks = [block for page_blocks in blocks_by_page.values() for block in page_blocks]
+    
+    # Translate each distinct text once; repeated headers, footers and labels share the
+    # result, and numbers, symbols and links keep their original text
+    unique_blocks = {}
+    for block in blocks:
+        if needs_translation(block["text"]):
+            unique_blocks.setdefault(normalize_text(block["text"]), block)
+    if len(unique_blocks) < len(blocks):
+        print(f"{len(blocks)} blocks have {len(unique_blocks)} distinct texts to translate")
+    
+    # Texts already translated by an earlier call or run are looked up per block,
+    # and only the unseen ones are sent
+    translations = {}
+    for text, block in list(unique_blocks.items()):
+        cached = get_cached_translation(translation_cache_key(text, source_lang, target_lang))
+        if cached is not None:
+            translations[text] = cached
+            del unique_blocks[text]
+    if translations:
+        print(f"{len(translations)} distinct texts already translated")
+    
+    # Group them into as few requests as the size limit allows
+    batches = pack_blocks(list(unique_blocks.values()))
+    batch_texts = [[block["text"] for block in batch] for batch in batches]
+    
+    # Send every batch at once over one aiohttp session first (no-op without aiohttp)
+    results = translate_batches_async(batch_texts, source_lang, target_lang)
+    pending = [batch_idx for batch_idx, parts in enumerate(results) if parts is None]
+    translated_ok = [[parts is not None] * len(texts) for parts, texts in zip(results, batch_texts)]
+    if len(pending) < len(batches):
+        print(f"Translated {len(batches) - len(pending)}/{len(batches)} batches in one async session")
+    
+    # The rest go through one thread pool: every batch is submitted up front, and batches
+    # that lose their separators are resubmitted block by block as soon as they come back,
+    # so the pool stays busy until the last result instead of draining batch by batch.
+    # Nothing is cached from here; the blocks that came back are saved together below
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for batch_idx, batch in enumerate(batches):
-            print(f"Translating batch {batch_idx + 1}/{len(batches)}")
-            
-            # Create translation tasks for this batch
-            future_to_block = {}
-            for block in batch:
-                future = executor.submit(translate_text, block["text"], source_lang, target_lang)
-                future_to_block[future] = block
-            
-            # Process completed translations
-            for future in concurrent.futures.as_completed(future_to_block):
-                block = future_to_block[future]
+        futures = {
+            executor.submit(send_text, BATCH_SEPARATOR.join(batch_texts[batch_idx]), source_lang, target_lang):
+                (batch_idx, None)
+            for batch_idx in pending
+        }
+        for batch_idx in pending:
+            # Keep the original text of anything whose translation fails
+            results[batch_idx] = list(batch_texts[batch_idx])
+        
+        # Process translations as they complete
+        while futures:
+            done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                batch_idx, block_idx = futures.pop(future)
                 try:
-                    translated_text = future.result()
-                    # Create a new block with the translated text
-                    translated_block = block.copy()
-                    translated_block["translated_text"] = translated_text
-                    translated_blocks.append(translated_block)
+                    translated = future.result()
                 except Exception as e:
-                    print(f"Error translating block: {e}")
-                    # Keep the original text if translation fails
-                    block["translated_text"] = block["text"]
-                    translated_blocks.append(block)
+                    print(f"Error translating batch: {e}")
+                    continue
+                if translated is None:
+                    continue
+                
+                if block_idx is not None:
+                    results[batch_idx][block_idx] = translated
+                    translated_ok[batch_idx][block_idx] = True
+                    continue
+                
+                texts = batch_texts[batch_idx]
+                parts = split_batch(translated, len(texts))
+                if parts is not None:
+                    results[batch_idx] = parts
+                    translated_ok[batch_idx] = [True] * len(texts)
+                    print(f"Translated batch {batch_idx + 1}/{len(batches)} ({len(texts)} blocks)")
+                else:
+                    print(f"Batch {batch_idx + 1} came back without its separators, translating its {len(texts)} blocks one by one")
+                    for block_idx, text in enumerate(texts):
+                        futures[executor.submit(send_text, text, source_lang, target_lang)] = (batch_idx, block_idx)
     
-    # Sort blocks by page and position
-    translated_blocks.sort(key=lambda b: (b["page"], b["rect"][1], b["rect"][0]))
-    return translated_blocks
+    # Cache every block that came back, whole batch or one by one, in one transaction,
+    # including texts the translator left unchanged so they are not sent again; failed
+    # blocks keep their original text uncached
+    rows = []
+    for batch, translated_texts, batch_ok in zip(batches, results, translated_ok):
+        for block, translated_text, ok in zip(batch, translated_texts, batch_ok):
+            text = normalize_text(block["text"])
+            translations[text] = translated_text
+            if ok:
+                rows.append((translation_cache_key(text, source_lang, target_lang), translated_text))
+    save_cached_translations(rows)
+    
+    translated_by_page = {}
+    for page_num, page_blocks in blocks_by_page.items():
+        translated_blocks = []
+        for block in page_blocks:
+            # Create a new block with the translated text
+            translated_block = block.copy()
+            translated_block["translated_text"] = translations.get(normalize_text(block["text"]), block["text"])
+            translated_blocks.append(translated_block)
+        
+        # Sort each page's blocks by position
+        translated_blocks.sort(key=lambda b: (b["rect"][1], b["rect"][0]))
+        translated_by_page[page_num] = translated_blocks
+    return translated_by_page
+
+# Font to draw translations with: built-in Helvetica, one of the base 14 fonts every PDF
+# reader has, so it is referenced by name and never embedded in the output
+FONT_NAME = "helv"
+
+def block_font_sizes(page_blocks):
+    """Font size for each block of a page: half the block's height, at most 12pt"""
+    if np is not None and page_blocks:
+        rects = np.array([block["rect"] for block in page_blocks], dtype=np.float32)
+        return np.minimum(12.0, (rects[:, 3] - rects[:, 1]) * 0.5).tolist()
+    return [min(12, (block["rect"][3] - block["rect"][1]) / 2) for block in page_blocks]
 
-def create_translated_pdf(input_path, translated_blocks, output_path):
-    """Create a new PDF with translated text blocks"""
+def save_translated_pdf(input_path, translated_pages, output_path):
+    """Copy the input PDF and draw each (page_num, translated blocks) of translated_pages on it as it arrives"""
     try:
         # Open the input PDF to copy pages
         input_doc = fitz.open(input_path)
@@ -116,71 +517,52 @@ def create_translated_pdf(input_path, translated_blocks, output_path):
         # Create a new PDF document
         output_doc = fitz.open()
         
-        # Group blocks by page
-        blocks_by_page = {}
-        for block in translated_blocks:
-            page_num = block["page"]
-            if page_num not in blocks_by_page:
-                blocks_by_page[page_num] = []
-            blocks_by_page[page_num].append(block)
+        # Copy all pages structurally in one go (content, images, links) instead of
+        # wrapping each one in an XObject with show_pdf_page
+        output_doc.insert_pdf(input_doc)
         
-        # Process each page
-        for page_num in range(len(input_doc)):
-            # Copy the original page
-            page = input_doc[page_num]
-            output_page = output_doc.new_page(width=page.rect.width, height=page.rect.height)
+        # Process each page with translated blocks
+        for page_num, page_blocks in translated_pages:
+            output_page = output_doc[page_num]
             
-            # Copy the page content (images, graphics, etc.)
-            output_page.show_pdf_page(output_page.rect, input_doc, page_num)
+            # First, remove the original text under every block and cover it in white, in one
+            # pass per page; images and vector graphics under the blocks are kept
+            rects = [fitz.Rect(block["rect"]) for block in page_blocks]
+            for rect in rects:
+                output_page.add_redact_annot(rect, fill=(1, 1, 1))
+            output_page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_NONE, graphics=fitz.PDF_REDACT_LINE_ART_NONE)
             
-            # If there are translated blocks for this page, add them
-            if page_num in blocks_by_page:
-                for block in blocks_by_page[page_num]:
-                    # Create a rectangle for the block
-                    rect = fitz.Rect(block["rect"])
-                    
-                    # First, create a white rectangle to cover the original text
-                    output_page.draw_rect(rect, color=(1, 1, 1), fill=(1, 1, 1))
+            # Font sizes for the whole page at once, from the rectangle sizes
+            font_sizes = block_font_sizes(page_blocks)
+            
+            for block, rect, font_size in zip(page_blocks, rects, font_sizes):
+                # Then insert the translated text
+                try:
+                    # Insert text with word wrapping
+                    text_inserted = output_page.insert_textbox(
+                        rect,
+                        block["translated_text"],
+                        fontname=FONT_NAME,
+                        fontsize=font_size,
+                        align=0  # Left alignment
+                    )
                     
-                    # Then insert the translated text
-                    try:
-                        # Try with standard fonts
-                        for font in ["Helvetica", "Times-Roman", "Courier"]:
-                            try:
-                                # Calculate font size based on rectangle size and text length
-                                font_size = min(12, rect.height / 2)
-                                
-                                # Insert text with word wrapping
-                                text_inserted = output_page.insert_textbox(
-                                    rect,
-                                    block["translated_text"],
-                                    fontname=font,
-                                    fontsize=font_size,
-                                    align=0  # Left alignment
-                                )
-                                
-                                if text_inserted >= 0:
-                                    break  # Text inserted successfully
-                            except Exception as font_error:
-                                print(f"Error with font {font}: {font_error}")
-                                continue
-                        
-                        # If all font attempts failed, try a simpler approach
-                        if text_inserted < 0:
-                            try:
-                                # Just insert text at the top-left of the rectangle
-                                output_page.insert_text(
-                                    (rect.x0, rect.y0 + 10),
-                                    block["translated_text"][:100] + ("..." if len(block["translated_text"]) > 100 else ""),
-                                    fontsize=8
-                                )
-                            except Exception as text_error:
-                                print(f"Simple text insertion failed: {text_error}")
-                    except Exception as e:
-                        print(f"Error inserting translated text: {e}")
+                    # If the text doesn't fit, try a simpler approach
+                    if text_inserted < 0:
+                        try:
+                            # Just insert text at the top-left of the rectangle
+                            output_page.insert_text(
+                                (rect.x0, rect.y0 + 10),
+                                block["translated_text"][:100] + ("..." if len(block["translated_text"]) > 100 else ""),
+                                fontsize=8
+                            )
+                        except Exception as text_error:
+                            print(f"Simple text insertion failed: {text_error}")
+                except Exception as e:
+                    print(f"Error inserting translated text: {e}")
         
-        # Save the document
-        output_doc.save(output_path)
+        # Save the document; redaction rewrites the page content streams, so compress them again
+        output_doc.save(output_path, garbage=4, deflate=True)
         output_doc.close()
         input_doc.close()
         return True
@@ -188,24 +570,100 @@ def create_translated_pdf(input_path, translated_blocks, output_path):
         print(f"Error creating translated PDF: {e}")
         return False
 
+def create_translated_pdf(input_path, translated_blocks_by_page, output_path):
+    """Create a new PDF with translated text blocks, given as {page_num: blocks}"""
+    return save_translated_pdf(input_path, translated_blocks_by_page.items(), output_path)
+
+# Extraction, translation and rendering run as a pipeline: pages move between the stages
+# through bounded queues, so rendering starts with the first translated pages. Pages are
+# translated a few batches' worth at a time to keep requests packed and the pool busy.
+PIPELINE_QUEUE_SIZE = 32
+PIPELINE_BATCHES = 5
+
+def _feed_queue(items, item_queue, errors, stop):
+    """Put every item on item_queue until stop is set, ending with None; a failure is added to errors and stops the pipeline"""
+    try:
+        for item in items:
+            if stop.is_set():
+                break
+            item_queue.put(item)
+    except Exception as e:
+        print(f"Pipeline stage failed: {e}")
+        errors.append(e)
+        stop.set()
+    finally:
+        item_queue.put(None)
+
+def iter_translated_pages(page_queue, source_lang, target_lang):
+    """Translate the (page_num, blocks) items of page_queue a group of pages at a time, yielding them in order"""
+    group = []
+    group_chars = 0
+    while True:
+        item = page_queue.get()
+        if item is not None:
+            group.append(item)
+            group_chars += sum(len(block["text"]) for block in item[1])
+        
+        if group and (item is None or group_chars >= BATCH_CHAR_LIMIT * PIPELINE_BATCHES):
+            yield from translate_blocks(dict(group), source_lang, target_lang).items()
+            group = []
+            group_chars = 0
+        
+        if item is None:
+            return
+
 def translate_pdf(input_path, output_path, source_lang, target_lang):
     """Translate a PDF file from source language to target language"""
     start_time = time.time()
     
     print(f"Extracting text blocks from {input_path}...")
-    blocks = extract_text_blocks(input_path)
+    pages = iter_page_blocks(input_path)
+    try:
+        first_page = next(pages, None)
+    except Exception as e:
+        print(f"Error extracting text blocks: {e}")
+        first_page = None
     
-    if not blocks:
+    if first_page is None:
         print("Failed to extract text blocks from PDF")
         return False
     
-    print(f"Found {len(blocks)} text blocks")
-    
-    print(f"Translating from {source_lang} to {target_lang}...")
-    translated_blocks = translate_blocks(blocks, source_lang, target_lang)
+    print(f"Translating from {source_lang} to {target_lang} while extracting and rendering...")
+    extracted_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    translated_queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    errors = []
+    stop = threading.Event()
+    stages = [
+        (threading.Thread(
+            target=_feed_queue, args=(itertools.chain([first_page], pages), extracted_queue, errors, stop), daemon=True
+        ), extracted_queue),
+        (threading.Thread(
+            target=_feed_queue,
+            args=(iter_translated_pages(extracted_queue, source_lang, target_lang), translated_queue, errors, stop),
+            daemon=True
+        ), translated_queue)
+    ]
+    for stage, _ in stages:
+        stage.start()
     
     print(f"Creating translated PDF at {output_path}...")
-    success = create_translated_pdf(input_path, translated_blocks, output_path)
+    success = save_translated_pdf(input_path, iter(translated_queue.get, None), output_path)
+    
+    # Stop both stages, taking items off their queues in case one is blocked on a full queue
+    stop.set()
+    for stage, stage_queue in stages:
+        while stage.is_alive():
+            try:
+                stage_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+    
+    # A failed stage ended its queue early, so what was saved is missing translations
+    if errors:
+        print(f"Translation failed: {errors[0]}")
+        if success and os.path.exists(output_path):
+            os.remove(output_path)
+        return False
     
     elapsed_time = time.time() - start_time
     if success:
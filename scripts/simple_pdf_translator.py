@@ -10,6 +10,10 @@ import time
 import fitz  # PyMuPDF
 import tempfile
 import argparse
+import re
+import sqlite3
+import hashlib
+import threading
 from deep_translator import GoogleTranslator
 
 def extract_text_from_pdf(pdf_path):
@@ -31,6 +35,74 @@ def extract_text_from_pdf(pdf_path):
         print(f"Error extracting text: {e}")
         return ""
 
+# Translations made so far, so repeated chunks are only sent once; they are also kept
+# on disk for 14 days, shared with the other standalone translators, so reruns skip the API
+_TRANSLATION_CACHE = {}
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "pdf_translator_cache")
+CACHE_DB_PATH = os.path.join(CACHE_DIR, "translations.db")
+CACHE_TTL = 14 * 24 * 3600
+_cache_lock = threading.Lock()
+_cache_db = None
+
+def translation_cache_key(text, source_lang, target_lang):
+    """Cache key for a text, with whitespace runs collapsed so layout variants share an entry"""
+    return (re.sub(r"\s+", " ", text).strip(), source_lang, target_lang)
+
+def _open_cache():
+    """Open the on-disk translation cache on first use (caller holds the lock), returning None if unavailable"""
+    global _cache_db
+    if _cache_db is None:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            _cache_db = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+            _cache_db.execute("PRAGMA journal_mode=WAL")
+            _cache_db.execute(
+                "CREATE TABLE IF NOT EXISTS translations("
+                "hash TEXT, src TEXT, tgt TEXT, translated TEXT, ts INTEGER, PRIMARY KEY (hash, src, tgt))"
+            )
+        except sqlite3.Error as e:
+            print(f"Translation cache unavailable: {e}")
+            _cache_db = False
+    return _cache_db or None
+
+def get_cached_translation(key):
+    """Look up a translation in memory, then on disk, returning None on a miss"""
+    if key in _TRANSLATION_CACHE:
+        return _TRANSLATION_CACHE[key]
+    text, source_lang, target_lang = key
+    try:
+        with _cache_lock:
+            db = _open_cache()
+            if db is None:
+                return None
+            row = db.execute(
+                "SELECT translated FROM translations WHERE hash=? AND src=? AND tgt=? AND ts>?",
+                (hashlib.md5(text.encode('utf-8')).hexdigest(), source_lang, target_lang, int(time.time()) - CACHE_TTL)
+            ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Error reading translation cache: {e}")
+        return None
+    if row:
+        _TRANSLATION_CACHE[key] = row[0]
+        return row[0]
+    return None
+
+def save_cached_translation(key, translated):
+    """Store a translation in memory and on disk"""
+    _TRANSLATION_CACHE[key] = translated
+    text, source_lang, target_lang = key
+    try:
+        with _cache_lock:
+            db = _open_cache()
+            if db is not None:
+                db.execute(
+                    "INSERT OR REPLACE INTO translations(hash, src, tgt, translated, ts) VALUES (?, ?, ?, ?, ?)",
+                    (hashlib.md5(text.encode('utf-8')).hexdigest(), source_lang, target_lang, translated, int(time.time()))
+                )
+                db.commit()
+    except sqlite3.Error as e:
+        print(f"Error saving translation cache: {e}")
+
 def translate_text(text, source_lang, target_lang):
     """Translate text from source language to target language"""
     if not text.strip():
@@ -44,46 +116,76 @@ def translate_text(text, source_lang, target_lang):
     max_chunk_size = 4000
     chunks = []
     
-    # Split by paragraphs first
+    # Split by paragraphs first; each chunk is collected as a list of paragraphs and joined
+    # once, with its joined length tracked alongside, instead of growing a string
     paragraphs = text.split('\n\n')
-    current_chunk = ""
+    current_chunk = []
+    current_len = 0
     
     for paragraph in paragraphs:
         # If adding this paragraph would exceed the chunk size, start a new chunk
-        if len(current_chunk) + len(paragraph) > max_chunk_size:
-            if current_chunk:
-                chunks.append(current_chunk)
-            current_chunk = paragraph
+        if current_len + len(paragraph) > max_chunk_size:
+            if current_len:
+                chunks.append('\n\n'.join(current_chunk))
+            current_chunk = [paragraph]
+            current_len = len(paragraph)
+        elif current_len:
+            current_chunk.append(paragraph)
+            current_len += 2 + len(paragraph)
         else:
-            if current_chunk:
-                current_chunk += '\n\n' + paragraph
-            else:
-                current_chunk = paragraph
+            current_chunk = [paragraph]
+            current_len = len(paragraph)
     
     # Add the last chunk if it's not empty
-    if current_chunk:
-        chunks.append(current_chunk)
+    if current_len:
+        chunks.append('\n\n'.join(current_chunk))
+    
+    # Serve chunks translated before from the cache
+    keys = [translation_cache_key(chunk, source_lang, target_lang) for chunk in chunks]
+    translated_chunks = [get_cached_translation(key) for key in keys]
+    pending = [i for i, translated in enumerate(translated_chunks) if translated is None]
+    if len(pending) < len(chunks):
+        print(f"{len(chunks) - len(pending)}/{len(chunks)} chunks already translated")
     
-    # Translate each chunk
-    translated_chunks = []
+    # One translator instance shared by all pending chunks, built once; if the language code is
+    # unsupported it stays None and every chunk goes straight to auto-detection
+    try:
+        translator = GoogleTranslator(source=source_lang, target=target_lang)
+    except Exception as e:
+        print(f"Error creating translator: {e}")
+        translator = None
+    auto_translator = None
     for i, chunk in enumerate(chunks):
+        if translated_chunks[i] is not None:
+            continue
+        
+        # Chunks go one at a time so a failure only costs that chunk
         print(f"Translating chunk {i+1}/{len(chunks)} ({len(chunk)} characters)")
-        try:
-            translator = GoogleTranslator(source=source_lang, target=target_lang)
-            translated = translator.translate(chunk)
-            translated_chunks.append(translated)
-        except Exception as e:
-            print(f"Error translating chunk {i+1}: {e}")
-            # If translation fails, try with auto-detection
+        if translator is not None:
             try:
-                print("Trying with auto-detection...")
-                translator = GoogleTranslator(source='auto', target=target_lang)
                 translated = translator.translate(chunk)
-                translated_chunks.append(translated)
+                save_cached_translation(keys[i], translated)
+                translated_chunks[i] = translated
+                continue
+            except Exception as e:
+                print(f"Error translating chunk {i+1}: {e}")
+        
+        # If translation fails, try with auto-detection; its result is cached under 'auto'
+        # so a guessed source language is never served as the requested one
+        auto_key = translation_cache_key(chunk, 'auto', target_lang)
+        translated = get_cached_translation(auto_key)
+        if translated is None and auto_translator is not False:
+            try:
+                print("Trying with auto-detection...")
+                if auto_translator is None:
+                    auto_translator = False
+                    auto_translator = GoogleTranslator(source='auto', target=target_lang)
+                translated = auto_translator.translate(chunk)
+                save_cached_translation(auto_key, translated)
             except Exception as auto_error:
                 print(f"Auto-detection also failed: {auto_error}")
-                # If all translation attempts fail, keep the original text
-                translated_chunks.append(chunk)
+        # If all translation attempts fail, keep the original text
+        translated_chunks[i] = chunk if translated is None else translated
     
     # Combine translated chunks
     return '\n\n'.join(translated_chunks)
@@ -7,12 +7,9 @@ translates it, and creates a new PDF with basic text only
 
 import os
 import sys
-import tempfile
 import subprocess
+import fitz  # PyMuPDF
 from deep_translator import GoogleTranslator
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
 
 def extract_text_with_command(pdf_path):
     """Use multiple command line tools to extract text"""
@@ -46,31 +43,17 @@ def extract_text_with_command(pdf_path):
 def extract_text_with_pdf2text(pdf_path):
     """Use pdf2text command from poppler tools"""
     try:
-        # Create temporary file for output
-        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as temp_file:
-            temp_txt_path = temp_file.name
-            
-        # Use pdf2text command (part of poppler)
-        cmd = ['pdf2text', '-simple', pdf_path, temp_txt_path]
+        # Use pdf2text command (part of poppler), writing to stdout ("-") instead of a temp file
+        cmd = ['pdf2text', '-simple', pdf_path, '-']
         process = subprocess.run(cmd, capture_output=True, check=False)
         
         # Check if successful
         if process.returncode != 0:
             print(f"pdf2text error: {process.stderr.decode('utf-8', errors='replace')}")
-            if os.path.exists(temp_txt_path):
-                os.unlink(temp_txt_path)
             return ""
             
-        # Read the extracted text
-        if os.path.exists(temp_txt_path):
-            with open(temp_txt_path, 'r', encoding='utf-8', errors='replace') as f:
-                text = f.read()
-                
-            # Clean up
-            os.unlink(temp_txt_path)
-            return text
-        else:
-            return ""
+        # The extracted text
+        return process.stdout.decode('utf-8', errors='replace')
     except Exception as e:
         print(f"pdf2text extraction failed: {e}")
         return ""
@@ -78,31 +61,17 @@ def extract_text_with_pdf2text(pdf_path):
 def extract_text_with_pdftotext(pdf_path):
     """Use pdftotext command line tool from poppler"""
     try:
-        # Create temporary file for output
-        with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as temp_file:
-            temp_txt_path = temp_file.name
-            
-        # Run pdftotext command
-        cmd = ['pdftotext', '-layout', pdf_path, temp_txt_path]
+        # Run pdftotext command, writing to stdout ("-") instead of a temp file
+        cmd = ['pdftotext', '-layout', pdf_path, '-']
         process = subprocess.run(cmd, capture_output=True, check=False)
         
         # Check if successful
         if process.returncode != 0:
             print(f"pdftotext error: {process.stderr.decode('utf-8', errors='replace')}")
-            if os.path.exists(temp_txt_path):
-                os.unlink(temp_txt_path)
             return ""
             
-        # Read the text back
-        if os.path.exists(temp_txt_path):
-            with open(temp_txt_path, 'r', encoding='utf-8', errors='replace') as f:
-                text = f.read()
-                
-            # Clean up
-            os.unlink(temp_txt_path)
-            return text
-        else:
-            return ""
+        # The extracted text
+        return process.stdout.decode('utf-8', errors='replace')
     except Exception as e:
         print(f"pdftotext extraction failed: {e}")
         return ""
@@ -160,87 +129,98 @@ def translate_text(text, source_lang, target_lang):
         print(f"Translation error: {e}")
         return text  # Return original text on error
 
+# Marker put between pages by the extractors
+PAGE_BREAK = "--- PAGE BREAK ---"
+
+def text_width(text, font, font_size, widths):
+    """Width of text in points, measuring each distinct character only once (cached in widths)"""
+    width = 0.0
+    for char in text:
+        if char not in widths:
+            widths[char] = font.glyph_advance(ord(char)) * font_size
+        width += widths[char]
+    return width
+
+def wrap_line(line, font, font_size, max_width, widths):
+    """Split a line into rows at most max_width points wide, breaking at spaces and inside words longer than a row"""
+    rows = []
+    row = []
+    row_width = 0.0
+    space_width = text_width(" ", font, font_size, widths)
+    for word in line.split(" "):
+        word_width = text_width(word, font, font_size, widths)
+        
+        # A word wider than a whole row is cut into pieces that each fill one
+        while word_width > max_width:
+            piece_width = 0.0
+            cut = 0
+            while cut < len(word) - 1 and piece_width + widths[word[cut]] <= max_width:
+                piece_width += widths[word[cut]]
+                cut += 1
+            cut = max(cut, 1)
+            piece_width = text_width(word[:cut], font, font_size, widths)
+            if row:
+                rows.append(" ".join(row))
+            rows.append(word[:cut])
+            row = []
+            row_width = 0.0
+            word = word[cut:]
+            word_width -= piece_width
+        
+        if row and row_width + space_width + word_width > max_width:
+            rows.append(" ".join(row))
+            row = [word]
+            row_width = word_width
+        else:
+            row_width += (space_width if row else 0.0) + word_width
+            row.append(word)
+    rows.append(" ".join(row))
+    return rows
+
 def create_simple_pdf(text, output_path):
     """Create a simple PDF with just text"""
-    c = canvas.Canvas(output_path, pagesize=letter)
-    width, height = letter
+    doc = fitz.open()
     
-    # Set font
-    font_name = "Helvetica"
+    # Set font, built once for the whole document and embedded once (it covers Latin,
+    # Greek and Cyrillic, unlike the built-in Helvetica encoding of insert_text)
+    font = fitz.Font("helv")
     font_size = 10
     line_height = font_size * 1.2
+    widths = {}
     
-    # Set margins
-    left_margin = 0.5 * inch
-    right_margin = width - 0.5 * inch
-    top_margin = height - 0.5 * inch
-    bottom_margin = 0.5 * inch
-    
-    # Available width for text
-    available_width = right_margin - left_margin
+    # Letter pages with 0.5 inch margins
+    page_rect = fitz.paper_rect("letter")
+    text_rect = page_rect + (36, 36, -36, -36)
+    rows_per_page = int(text_rect.height // line_height)
     
-    # Split text into lines
-    lines = text.split('\\n')
+    # The PyPDF2 extractor writes literal "\\n" sequences instead of line breaks
+    text = text.replace('\\n', '\n')
     
-    # Start at top margin
-    y_position = top_margin
-    
-    # Set font
-    c.setFont(font_name, font_size)
-    
-    for line in lines:
-        # Check if we need a new page
-        if y_position < bottom_margin:
-            c.showPage()
-            y_position = top_margin
-            c.setFont(font_name, font_size)
-            
-        # Check if it's a page break marker
-        if "--- PAGE BREAK ---" in line:
-            c.showPage()
-            y_position = top_margin
-            c.setFont(font_name, font_size)
+    for section in text.split(PAGE_BREAK):
+        # Each section starts on a new page; its lines are wrapped once, with character
+        # widths measured once per document, and then written a page of rows at a time
+        section = section.strip('\n')
+        if not section:
             continue
-            
-        # Draw text
-        text_width = c.stringWidth(line, font_name, font_size)
-        
-        # If text is too wide, wrap it
-        if text_width > available_width:
-            words = line.split()
-            current_line = ""
-            
-            for word in words:
-                test_line = current_line + " " + word if current_line else word
-                test_width = c.stringWidth(test_line, font_name, font_size)
-                
-                if test_width <= available_width:
-                    current_line = test_line
-                else:
-                    # Draw current line and start a new one
-                    if current_line:
-                        c.drawString(left_margin, y_position, current_line)
-                        y_position -= line_height
-                        
-                        # Check if we need a new page
-                        if y_position < bottom_margin:
-                            c.showPage()
-                            y_position = top_margin
-                            c.setFont(font_name, font_size)
-                            
-                    current_line = word
-                    
-            # Draw the last line
-            if current_line:
-                c.drawString(left_margin, y_position, current_line)
-                y_position -= line_height
-        else:
-            # Draw the line directly
-            c.drawString(left_margin, y_position, line)
-            y_position -= line_height
+        rows = [row for line in section.split('\n') for row in wrap_line(line, font, font_size, text_rect.width, widths)]
+        for first_row in range(0, len(rows), rows_per_page):
+            page = doc.new_page(width=page_rect.width, height=page_rect.height)
+            page.insert_font(fontname="F0", fontbuffer=font.buffer)
+            page.insert_text(
+                (text_rect.x0, text_rect.y0 + font_size),
+                "\n".join(rows[first_row:first_row + rows_per_page]),
+                fontname="F0",
+                fontsize=font_size,
+                lineheight=1.2
+            )
+    
+    # An empty text still gets one blank page
+    if len(doc) == 0:
+        doc.new_page(width=page_rect.width, height=page_rect.height)
     
     # Save the PDF
-    c.save()
+    doc.save(output_path, garbage=3, deflate=True)
+    doc.close()
     return True
 
 def simple_translate_pdf(input_path, output_path, source_lang, target_lang):